@@ -1,61 +1,120 @@
+import threading
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
-from routes.auth import auth_bp
-from routes.businesses import businesses_bp
-from routes.reviews import reviews_bp
+from utils.db import init_db, reset_client
+from utils.storage import get_storage, storage_backend, create_storage, set_storage
+from utils.cache import clear_caches
+from utils.singleflight import flights
+from utils.catalog_snapshot import catalog_snapshot
+from utils.suggest_index import suggest_index, build_suggest_index
+from utils.profiling import init_profiling
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-CORS(app)
-jwt = JWTManager(app)
-
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(businesses_bp, url_prefix='/api/businesses')
-app.register_blueprint(reviews_bp, url_prefix='/api')
-
-@app.route('/')
-def home():
-    return jsonify({
-        "message": "Biz Directory API",
-        "version": "1.0.0",
-        "endpoints": {
-            "auth": {
-                "POST /api/auth/register": "Register a new user",
-                "POST /api/auth/login": "Login and get JWT token",
-                "GET /api/auth/me": "Get current user info (requires auth)"
-            },
-            "businesses": {
-                "GET /api/businesses": "Get all businesses (with pagination)",
-                "GET /api/businesses/search": "Search businesses by name, city, state, or category",
-                "GET /api/businesses/<id>": "Get a single business by ID",
-                "POST /api/businesses": "Create a new business (requires auth)",
-                "PUT /api/businesses/<id>": "Update a business (admin only)",
-                "DELETE /api/businesses/<id>": "Delete a business (admin only)"
-            },
-            "reviews": {
-                "GET /api/businesses/<id>/reviews": "Get all reviews for a business",
-                "POST /api/businesses/<id>/reviews": "Create a review (requires auth)",
-                "GET /api/reviews/<id>": "Get a single review by ID",
-                "PUT /api/reviews/<id>": "Update a review (owner or admin)",
-                "DELETE /api/reviews/<id>": "Delete a review (owner or admin)"
+def create_app():
+    # Settings come only from the environment through Config: the storage
+    # backend, caches, profiling and snapshot code read Config directly.
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    
+    CORS(app)
+    JWTManager(app)
+    init_db(app)
+    init_profiling(app)
+    init_storage()
+    
+    from routes.auth import auth_bp
+    from routes.businesses import businesses_bp
+    from routes.reviews import reviews_bp
+    from routes.admin import admin_bp
+    from routes.users import users_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(businesses_bp, url_prefix='/api/businesses')
+    app.register_blueprint(reviews_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+    
+    @app.route('/')
+    def home():
+        return jsonify({
+            "message": "Biz Directory API",
+            "version": "1.0.0",
+            "endpoints": {
+                "auth": {
+                    "POST /api/auth/register": "Register a new user",
+                    "POST /api/auth/login": "Login and get JWT token",
+                    "GET /api/auth/me": "Get current user info (requires auth)"
+                },
+                "businesses": {
+                    "GET /api/businesses": "Get all businesses (with pagination)",
+                    "GET /api/businesses/search": "Search businesses by name, city, state, or category",
+                    "GET /api/businesses/suggest?q=<prefix>": "Autocomplete business names, categories and cities",
+                    "GET /api/businesses/batch?ids=<id>,<id>": "Get multiple businesses by ID",
+                    "GET /api/businesses/<id>": "Get a single business by ID (supports ?include=reviews,stats and ?fields=)",
+                    "GET /api/businesses/<id>/trend": "Review count and rating per day or week for a business",
+                    "GET /api/businesses/categories/<category>/trend": "Review count and rating per day or week for a category",
+                    "POST /api/businesses": "Create a new business (requires auth)",
+                    "PUT /api/businesses/<id>": "Update a business (admin only)",
+                    "DELETE /api/businesses/<id>": "Delete a business (admin only)"
+                },
+                "reviews": {
+                    "GET /api/businesses/<id>/reviews": "Get all reviews for a business",
+                    "POST /api/businesses/<id>/reviews": "Create a review (requires auth)",
+                    "GET /api/reviews/batch?ids=<id>,<id>": "Get multiple reviews by ID",
+                    "GET /api/reviews/<id>": "Get a single review by ID",
+                    "PUT /api/reviews/<id>": "Update a review (owner or admin)",
+                    "DELETE /api/reviews/<id>": "Delete a review (owner or admin)"
+                },
+                "users": {
+                    "GET /api/users/<id>/reviews": "Get a user's reviews, newest first (cursor pagination)",
+                    "GET /api/users/me/reviews": "Get the current user's reviews (requires auth)"
+                },
+                "admin": {
+                    "GET /api/admin/profiles": "List recent request profiles (admin only)",
+                    "GET /api/admin/profiles/<id>": "Get a request profile with its Mongo commands (admin only)",
+                    "GET /api/admin/profiles/<id>/pstats": "Download a profile as a pstats file (admin only)",
+                    "GET /api/admin/profiles/<id>/flamegraph": "Download a profile as folded stacks (admin only)",
+                    "POST /api/admin/profiles/token": "Create a signed header to profile one request (admin only)",
+                    "GET /api/admin/metrics": "Cache and single-flight counters (admin only)"
+                }
             }
-        }
-    })
+        })
+    
+    @app.route('/health')
+    def health():
+        return jsonify({"status": "healthy"})
+    
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({"error": "Endpoint not found"}), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        return jsonify({"error": "Internal server error"}), 500
+    
+    return app
 
-@app.route('/health')
-def health():
-    return jsonify({"status": "healthy"})
+def init_storage():
+    storage = create_storage(storage_backend())
+    set_storage(storage)
+    if storage.name == 'memory' and Config.MEMORY_SEED:
+        from seed_data import seed
+        seed(storage, log=lambda message: None)
 
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({"error": "Endpoint not found"}), 404
+def warm_suggest_index():
+    try:
+        build_suggest_index(get_storage())
+    except Exception as e:
+        print(f"Suggest index warm-up failed, it will be built on first use: {e}")
 
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({"error": "Internal server error"}), 500
+def init_worker():
+    reset_client()
+    clear_caches()
+    flights.reset()
+    suggest_index.reset()
+    catalog_snapshot.reset()
+    threading.Thread(target=warm_suggest_index, daemon=True).start()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+import argparse
+from utils.storage import get_storage
+from utils.helpers import validate_object_id
+from utils.user_reviews import sync_business_info
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy business names and categories onto reviews and index reviews by user")
+    parser.add_argument('--business', help="Only backfill the reviews of this business ID")
+    args = parser.parse_args()
+    
+    storage = get_storage()
+    storage.reviews.ensure_indexes()
+    
+    if args.business:
+        business_id = validate_object_id(args.business)
+        if not business_id:
+            print(f"Error: invalid business ID {args.business}")
+            return
+        business_ids = [business_id]
+    else:
+        business_ids = [business['_id'] for business in storage.businesses.all({"_id": 1})]
+    
+    for business_id in business_ids:
+        sync_business_info(storage, business_id)
+    
+    print(f"✓ Backfilled business info on the reviews of {len(business_ids)} businesses")
+
+if __name__ == "__main__":
+    main()
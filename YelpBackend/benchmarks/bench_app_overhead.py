@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""Time API endpoints against each storage backend to separate app overhead from database cost.
+
+The memory backend needs no database, so its timings are the cost of Flask,
+serialization and the app's own logic; the difference to the mongo backend is
+what the database adds. Run from the project root (mongo wipes the configured
+database, point MONGO_URI at a disposable one):
+
+    python -m benchmarks.bench_app_overhead --backends memory
+    python -m benchmarks.bench_app_overhead --backends memory,mongo --businesses 500 --reviews 20000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from utils.cache import clear_caches
+from utils.catalog_snapshot import catalog_snapshot
+from utils.suggest_index import suggest_index
+from utils.storage import create_storage, set_storage
+from utils.review_summary import empty_histogram, rebuild_review_summary
+from utils.review_rollups import ensure_rollup_indexes, rebuild_review_rollups
+
+CITIES = ["New York", "Brooklyn", "Boston", "Chicago", "Austin", "Denver", "Seattle", "Portland"]
+CATEGORIES = ["Coffee & Tea", "Italian", "Bookstore", "Bakery", "Vegan", "Electronics Repair"]
+
+def seed(storage, business_count, review_count, user_count):
+    rng = random.Random(7)
+    storage.users.delete_all()
+    storage.businesses.delete_all()
+    storage.reviews.delete_all()
+    storage.ensure_indexes()
+    
+    user_ids = [
+        storage.users.create({"username": f"bench_user_{i}", "email": f"bench_{i}@example.com", "role": "user"})
+        for i in range(user_count)
+    ]
+    business_ids = [
+        storage.businesses.create({
+            "name": f"Bench Business {i}",
+            "city": rng.choice(CITIES),
+            "state": "NY",
+            "address": f"{i} Main Street",
+            "category": rng.choice(CATEGORIES),
+            "phone": "",
+            "rating": 0,
+            "reviewCount": 0,
+            "ratingHistogram": empty_histogram(),
+            "latestReviews": [],
+            "createdAt": datetime.utcnow()
+        })
+        for i in range(business_count)
+    ]
+    
+    now = datetime.utcnow()
+    authors = set()
+    while len(authors) < min(review_count, business_count * user_count):
+        authors.add((rng.choice(business_ids), rng.choice(user_ids)))
+    for business_id, user_id in authors:
+        storage.reviews.create({
+            "businessId": business_id,
+            "userId": user_id,
+            "rating": rng.randint(1, 5),
+            "text": "Benchmark review text " * 5,
+            "createdAt": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        })
+    
+    for business_id in business_ids:
+        average_rating, count = storage.reviews.rating_stats(business_id)
+        if count:
+            storage.businesses.set_rating(business_id, round(average_rating, 1), count)
+        rebuild_review_summary(storage, business_id)
+    ensure_rollup_indexes(storage)
+    rebuild_review_rollups(storage)
+    
+    busiest = max(business_ids, key=lambda business_id: storage.reviews.count_for_business(business_id))
+    return busiest
+
+def endpoints(business_id):
+    return [
+        ("listing", "/api/businesses/?limit=20"),
+        ("search", "/api/businesses/search?city=new&rating=3"),
+        ("search by name", "/api/businesses/search?name=business%201"),
+        ("business", f"/api/businesses/{business_id}"),
+        ("details", f"/api/businesses/{business_id}?include=reviews,stats&review_limit=20"),
+        ("review feed", f"/api/businesses/{business_id}/reviews?page=2&limit=20"),
+        ("trend", f"/api/businesses/{business_id}/trend?granularity=week"),
+        ("suggest", "/api/businesses/suggest?q=ben")
+    ]
+
+def measure(client, path, runs, cached):
+    timings = []
+    for _ in range(runs):
+        if not cached:
+            clear_caches()
+        start = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {response.status_code}: {response.get_json()}")
+    timings.sort()
+    return statistics.median(timings), timings[max(int(len(timings) * 0.95) - 1, 0)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', default='memory')
+    parser.add_argument('--businesses', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--cached', action='store_true', help="Keep response caches between requests")
+    args = parser.parse_args()
+    
+    app = create_app()
+    client = app.test_client()
+    results = {}
+    backends = args.backends.split(',')
+    
+    for backend in backends:
+        storage = create_storage(backend)
+        started = time.perf_counter()
+        business_id = seed(storage, args.businesses, args.reviews, args.users)
+        print(f"Seeded {backend}: {args.businesses} businesses, {args.reviews} reviews in {time.perf_counter() - started:.1f} s")
+        set_storage(storage)
+        clear_caches()
+        suggest_index.reset()
+        catalog_snapshot.reset()
+        for name, path in endpoints(business_id):
+            client.get(path)
+            results[(backend, name)] = measure(client, path, args.runs, args.cached)
+    
+    print()
+    print(f"{'endpoint':>16}" + "".join(f" {backend + ' p50':>12} {backend + ' p95':>12}" for backend in backends))
+    for name, _ in endpoints(None):
+        row = f"{name:>16}"
+        for backend in backends:
+            p50, p95 = results[(backend, name)]
+            row += f" {p50:>9.2f} ms {p95:>9.2f} ms"
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Measure catalog snapshot query latency and per-worker memory as workers are added.
+
+Needs no database; the snapshot is built from a synthetic catalog. Run from the
+project root (Linux, reads /proc/self/smaps_rollup):
+
+    python -m benchmarks.bench_catalog_snapshot --businesses 200000 --workers 1,4,16
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from bson import ObjectId
+from utils.catalog_snapshot import SnapshotView, write_snapshot
+
+CITIES = [f"City {i}" for i in range(500)]
+STATES = [f"S{i}" for i in range(50)]
+CATEGORIES = [f"Category {i}" for i in range(200)]
+
+QUERIES = [
+    ("all", {}, None),
+    ("rating >= 4", {}, 4.0),
+    ("category", {"category": "Category 7$"}, None),
+    ("city + rating", {"city": "City 12"}, 3.5),
+    ("state + category", {"state": "^S3$", "category": "Category 1"}, None)
+]
+
+def synthetic_catalog(count):
+    rng = random.Random(7)
+    for _ in range(count):
+        yield {
+            "_id": ObjectId(),
+            "rating": round(rng.uniform(1, 5), 1),
+            "reviewCount": rng.randint(0, 500),
+            "city": rng.choice(CITIES),
+            "state": rng.choice(STATES),
+            "category": rng.choice(CATEGORIES)
+        }
+
+def memory_kb():
+    usage = {}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                usage[parts[0].rstrip(':')] = int(parts[1])
+    return usage['Private_Clean'] + usage['Private_Dirty'], usage['Shared_Clean'] + usage['Shared_Dirty']
+
+def worker(path, result_fd):
+    before_private, _ = memory_kb()
+    view = SnapshotView(path)
+    for _, filters, min_rating in QUERIES:
+        view.query(filters, min_rating, 0, 20)
+    after_private, after_shared = memory_kb()
+    os.write(result_fd, f"{after_private - before_private} {after_shared}\n".encode())
+    os._exit(0)
+
+def measure_workers(path, worker_count):
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(worker_count):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            worker(path, write_fd)
+        pids.append(pid)
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as results:
+        samples = [tuple(map(int, line.split())) for line in results]
+    return statistics.mean(private for private, _ in samples), statistics.mean(shared for _, shared in samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--businesses', type=int, default=100000)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.snapshot')
+    started = time.perf_counter()
+    write_snapshot(path, synthetic_catalog(args.businesses))
+    print(f"Built snapshot of {args.businesses} businesses in {time.perf_counter() - started:.2f} s ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    
+    view = SnapshotView(path)
+    print()
+    print(f"{'query':>18} {'matches':>8} {'p50':>9} {'p95':>9}")
+    for name, filters, min_rating in QUERIES:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            total, _ = view.query(filters, min_rating, 0, 20)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{name:>18} {total:>8} {statistics.median(timings):>6.2f} ms {timings[int(len(timings) * 0.95) - 1]:>6.2f} ms")
+    
+    print()
+    print(f"{'workers':>8} {'private/worker':>15} {'shared/worker':>14}")
+    for worker_count in [int(count) for count in args.workers.split(',')]:
+        private_kb, shared_kb = measure_workers(path, worker_count)
+        print(f"{worker_count:>8} {private_kb / 1024:>12.1f} MB {shared_kb / 1024:>11.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Compare review feed pages served from the reviews collection and from review buckets.
+
+Run from the project root against a disposable database:
+
+    python -m benchmarks.bench_review_layouts --reviews 200000
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+from config import Config
+from utils.review_buckets import ensure_bucket_indexes, rebuild_buckets, get_bucket_page
+
+def seed(db, review_count):
+    db.users.drop()
+    db.businesses.drop()
+    db.reviews.drop()
+    db.review_buckets.drop()
+    
+    user_ids = db.users.insert_many([
+        {"username": f"bench_user_{i}", "email": f"bench_{i}@example.com", "role": "user"}
+        for i in range(100)
+    ]).inserted_ids
+    business_id = db.businesses.insert_one({
+        "name": "Benchmark Diner",
+        "rating": 0,
+        "reviewCount": review_count,
+        "createdAt": datetime.utcnow()
+    }).inserted_id
+    
+    started = datetime.utcnow() - timedelta(seconds=review_count)
+    batch = []
+    for i in range(review_count):
+        batch.append({
+            "businessId": business_id,
+            "userId": user_ids[i % len(user_ids)],
+            "rating": i % 5 + 1,
+            "text": "Benchmark review text " * 4,
+            "createdAt": started + timedelta(seconds=i)
+        })
+        if len(batch) == 10000:
+            db.reviews.insert_many(batch)
+            batch = []
+    if batch:
+        db.reviews.insert_many(batch)
+    
+    ensure_bucket_indexes(db)
+    rebuild_buckets(db, business_id)
+    return business_id
+
+def documents_page(db, business_id, skip, limit):
+    total = db.reviews.count_documents({"businessId": business_id})
+    reviews = list(db.reviews.find({"businessId": business_id}).sort("createdAt", -1).skip(skip).limit(limit))
+    user_ids = list({review['userId'] for review in reviews})
+    list(db.users.find({"_id": {"$in": user_ids}}, {"username": 1}))
+    return total, reviews
+
+def buckets_page(db, business_id, skip, limit):
+    business = db.businesses.find_one({"_id": business_id}, {"reviewCount": 1})
+    return business['reviewCount'], get_bucket_page(db, business_id, business['reviewCount'], skip, limit)
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uri', default=Config.MONGO_URI.rsplit('/', 1)[0] + '/biz_directory_bench')
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--pages', default='1,10,100,1000')
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+    
+    db = MongoClient(args.uri).get_database()
+    print(f"Seeding {args.reviews} reviews into {db.name} (bucket size {Config.REVIEW_BUCKET_SIZE})...")
+    business_id = seed(db, args.reviews)
+    
+    print()
+    print(f"{'page':>8} {'documents p50':>14} {'p95':>8} {'buckets p50':>12} {'p95':>8}")
+    for page in [int(page) for page in args.pages.split(',')]:
+        skip = (page - 1) * args.limit
+        if skip >= args.reviews:
+            continue
+        
+        _, expected = documents_page(db, business_id, skip, args.limit)
+        _, actual = buckets_page(db, business_id, skip, args.limit)
+        assert [review['_id'] for review in expected] == [review['_id'] for review in actual], "layouts disagree"
+        
+        doc_p50, doc_p95 = measure(lambda: documents_page(db, business_id, skip, args.limit), args.runs)
+        bucket_p50, bucket_p95 = measure(lambda: buckets_page(db, business_id, skip, args.limit), args.runs)
+        print(f"{page:>8} {doc_p50:>11.2f} ms {doc_p95:>5.2f} ms {bucket_p50:>9.2f} ms {bucket_p95:>5.2f} ms")
+
+if __name__ == "__main__":
+    main()
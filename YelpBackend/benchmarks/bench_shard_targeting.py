@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""Count how many shards each API request touches on a sharded cluster.
+
+Every shard's profiler records the operations mongos routes to it, so a request
+whose queries carry the shard key shows up on one shard (targeted) and one
+without it on every shard that owns data of the collection (scatter). Run from
+the project root against a disposable cluster, e.g. one started with
+./start_sharded_cluster.sh:
+
+    python -m benchmarks.bench_shard_targeting --businesses 200 --reviews 5000
+"""
+import argparse
+from collections import defaultdict
+from bson import MinKey
+from pymongo import MongoClient
+from config import Config
+from app import create_app
+from utils.cache import clear_caches
+from utils.mongo_storage import MongoStorage
+from utils.storage import set_storage
+from benchmarks.bench_app_overhead import seed
+
+def shard_databases(client, db_name):
+    shards = client.admin.command("listShards")['shards']
+    return {
+        shard['_id']: MongoClient(shard['host'].split('/')[-1].split(',')[0], directConnection=True)[db_name]
+        for shard in shards
+    }
+
+def spread_reviews(client, namespace, business_ids, shard_names):
+    """Split reviews at business boundaries and give each shard a range, so scatter queries reach every shard."""
+    business_ids = sorted(business_ids)
+    step = max(len(business_ids) // len(shard_names), 1)
+    for index, shard_name in enumerate(shard_names):
+        boundary = {"businessId": business_ids[min(index * step, len(business_ids) - 1)], "userId": MinKey()}
+        if index:
+            try:
+                client.admin.command("split", namespace, middle=boundary)
+            except Exception:
+                pass
+        try:
+            client.admin.command("moveChunk", namespace, find=boundary, to=shard_name)
+        except Exception:
+            pass
+
+def start_profiling(databases):
+    for db in databases.values():
+        db.command("profile", 0)
+        db.system.profile.drop()
+        db.command("profile", 2)
+
+def profiled_operations(databases, collections):
+    touched = defaultdict(dict)
+    for shard_name, db in databases.items():
+        db.command("profile", 0)
+        for entry in db.system.profile.find({}, {"ns": 1}):
+            collection = entry.get('ns', '').split('.', 1)[-1]
+            if collection in collections:
+                touched[collection][shard_name] = touched[collection].get(shard_name, 0) + 1
+    return touched
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--businesses', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    if client.admin.command("hello").get('msg') != 'isdbgrid':
+        print("MONGO_URI must point at a mongos; start a cluster with ./start_sharded_cluster.sh")
+        return
+    
+    app = create_app()
+    storage = MongoStorage()
+    set_storage(storage)
+    db_name = storage.db.name
+    collections = storage.shard_keys()
+    databases = shard_databases(client, db_name)
+    
+    business_id = seed(storage, args.businesses, args.reviews, args.users)
+    business_ids = [business['_id'] for business in storage.businesses.all({"_id": 1})]
+    spread_reviews(client, f"{db_name}.reviews", business_ids, sorted(databases))
+    print(f"Seeded {args.businesses} businesses and {args.reviews} reviews across {len(databases)} shards")
+    
+    web = app.test_client()
+    web.post('/api/auth/register', json={"username": "shard_bench", "email": "shard_bench@example.com", "password": "bench"})
+    token = web.post('/api/auth/login', json={"email": "shard_bench@example.com", "password": "bench"}).get_json()['access_token']
+    headers = {"Authorization": f"Bearer {token}"}
+    author = storage.reviews.list_for_business(business_id, 0, 1)[0]
+    review_id = author['_id']
+    batch_ids = ','.join(str(other_id) for other_id in business_ids[:3])
+    state = {}
+    
+    def create_review():
+        response = web.post(f'/api/businesses/{business_id}/reviews', json={"rating": 4, "text": "Sharded"}, headers=headers)
+        state['review_id'] = response.get_json()['review']['_id']
+        return response
+    
+    def review_path():
+        return f"/api/reviews/{state['review_id']}?businessId={business_id}"
+    
+    requests = [
+        ("business", lambda: web.get(f'/api/businesses/{business_id}')),
+        ("business batch (3)", lambda: web.get(f'/api/businesses/batch?ids={batch_ids}')),
+        ("details + reviews", lambda: web.get(f'/api/businesses/{business_id}?include=reviews,stats&review_limit=20')),
+        ("review feed", lambda: web.get(f'/api/businesses/{business_id}/reviews?page=2&limit=20')),
+        ("business trend", lambda: web.get(f'/api/businesses/{business_id}/trend')),
+        ("create review", create_review),
+        ("update review", lambda: web.put(review_path(), json={"rating": 2}, headers=headers)),
+        ("delete review", lambda: web.delete(review_path(), headers=headers)),
+        ("review by id", lambda: web.get(f'/api/reviews/{review_id}')),
+        ("user reviews", lambda: web.get(f"/api/users/{author['userId']}/reviews")),
+        ("listing", lambda: web.get('/api/businesses/?limit=20')),
+        ("search by name", lambda: web.get('/api/businesses/search?name=business%201'))
+    ]
+    
+    print()
+    print(f"{'request':>20} {'routing':>10}  collection: shards touched (operations per shard)")
+    for name, call in requests:
+        clear_caches()
+        start_profiling(databases)
+        response = call()
+        touched = profiled_operations(databases, collections)
+        if response.status_code >= 400:
+            print(f"{name:>20} failed with {response.status_code}: {response.get_json()}")
+            continue
+        routing = "targeted" if all(len(shards) == 1 for shards in touched.values()) else "scatter"
+        detail = ', '.join(
+            f"{collection}: {len(shards)}/{len(databases)} ({', '.join(str(count) for count in shards.values())})"
+            for collection, shards in sorted(touched.items())
+        )
+        print(f"{name:>20} {routing:>10}  {detail}")
+
+if __name__ == "__main__":
+    main()
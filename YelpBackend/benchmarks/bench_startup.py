@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Measure cold-start time and memory of the API in fresh interpreter processes.
+
+Run from the project root:
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --importtime
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = '''
+import json, resource, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/health')
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - started) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+'''
+
+def run_probe():
+    output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def show_import_times(top):
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>9.1f} ms {self_us / 1000:>7.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--importtime', action='store_true', help="List the slowest imports instead")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    
+    if args.importtime:
+        show_import_times(args.top)
+        return
+    
+    results = [run_probe() for _ in range(args.runs)]
+    print(f"{'metric':<18} {'median':>10} {'min':>10} {'max':>10}")
+    for metric in ['import_ms', 'create_app_ms', 'first_request_ms', 'total_ms', 'max_rss_mb']:
+        values = [result[metric] for result in results]
+        print(f"{metric:<18} {statistics.median(values):>10.1f} {min(values):>10.1f} {max(values):>10.1f}")
+
+if __name__ == "__main__":
+    main()
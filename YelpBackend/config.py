@@ -7,3 +7,26 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/biz_directory')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY') or os.getenv('SESSION_SECRET', 'dev-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = 3600
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    MEMORY_SEED = os.getenv('MEMORY_SEED', '0') == '1'
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 30))
+    CACHE_STALE_SECONDS = int(os.getenv('CACHE_STALE_SECONDS', 10))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', 100))
+    REVIEW_STORAGE = os.getenv('REVIEW_STORAGE', 'documents')
+    REVIEW_BUCKET_SIZE = int(os.getenv('REVIEW_BUCKET_SIZE', 100))
+    EMBEDDED_REVIEW_COUNT = int(os.getenv('EMBEDDED_REVIEW_COUNT', 5))
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_SECRET = os.getenv('PROFILE_SECRET') or JWT_SECRET_KEY
+    PROFILE_BUFFER_SIZE = int(os.getenv('PROFILE_BUFFER_SIZE', 20))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 1))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+    TREND_MAX_PERIODS = int(os.getenv('TREND_MAX_PERIODS', 366))
+    CATALOG_SNAPSHOT = os.getenv('CATALOG_SNAPSHOT', '0') == '1'
+    CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', 'data/catalog.snapshot')
+    CATALOG_SNAPSHOT_CHECK_SECONDS = float(os.getenv('CATALOG_SNAPSHOT_CHECK_SECONDS', 1))
+    CATALOG_SNAPSHOT_REFRESH_SECONDS = int(os.getenv('CATALOG_SNAPSHOT_REFRESH_SECONDS', 300))
+    SUGGEST_REFRESH_SECONDS = int(os.getenv('SUGGEST_REFRESH_SECONDS', 300))
+    SUGGEST_SCAN_LIMIT = int(os.getenv('SUGGEST_SCAN_LIMIT', 256))
@@ -1,31 +1,35 @@
 #!/usr/bin/env python
 import json
 import os
-from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
+from utils.storage import get_storage
 
-MONGO_URI = 'mongodb://localhost:27017/biz_directory'
+def serialize_value(value):
+    """Convert ObjectIds and datetimes, including those in nested documents and arrays"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: serialize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [serialize_value(item) for item in value]
+    return value
 
 def serialize_doc(doc):
     """Convert MongoDB document to JSON-serializable format"""
     if doc is None:
         return None
     
-    for key, value in doc.items():
-        if isinstance(value, ObjectId):
-            doc[key] = str(value)
-        elif isinstance(value, datetime):
-            doc[key] = value.isoformat()
-    
-    return doc
+    return serialize_value(doc)
 
-def export_collection(db, collection_name, output_file):
-    """Export a MongoDB collection to a JSON file"""
+def export_collection(storage, collection_name, output_file):
+    """Export a collection to a JSON file"""
     print(f"Exporting {collection_name} collection...")
     
-    collection = db[collection_name]
-    documents = list(collection.find())
+    repository = getattr(storage, collection_name)
+    documents = list(repository.all())
     
     serialized_docs = [serialize_doc(doc) for doc in documents]
     
@@ -44,12 +48,11 @@ def main():
     os.makedirs('exports', exist_ok=True)
     
     try:
-        client = MongoClient(MONGO_URI)
-        db = client.get_database()
+        storage = get_storage()
         
-        total_users = export_collection(db, 'users', 'exports/users.json')
-        total_businesses = export_collection(db, 'businesses', 'exports/businesses.json')
-        total_reviews = export_collection(db, 'reviews', 'exports/reviews.json')
+        total_users = export_collection(storage, 'users', 'exports/users.json')
+        total_businesses = export_collection(storage, 'businesses', 'exports/businesses.json')
+        total_reviews = export_collection(storage, 'reviews', 'exports/reviews.json')
         
         print()
         print("=" * 60)
@@ -66,7 +69,7 @@ def main():
         print()
         print("To create submission ZIP:")
         print("  cd exports && zip ../biz-directory-mongodb.zip *.json")
-        
+    
     except Exception as e:
         print(f"Error: {e}")
         print()
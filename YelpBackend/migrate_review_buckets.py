@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+import argparse
+from pymongo import MongoClient
+from config import Config
+from utils.helpers import validate_object_id
+from utils.review_buckets import ensure_bucket_indexes, rebuild_buckets
+
+def main():
+    parser = argparse.ArgumentParser(description="Build bucketed review pages from the reviews collection")
+    parser.add_argument('--business', help="Only rebuild the buckets of this business ID")
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    db = client.get_database()
+    
+    print("Creating bucket indexes...")
+    ensure_bucket_indexes(db)
+    
+    if args.business:
+        business_id = validate_object_id(args.business)
+        if not business_id:
+            print(f"Error: invalid business ID {args.business}")
+            return
+        business_ids = [business_id]
+    else:
+        business_ids = [business['_id'] for business in db.businesses.find({}, {"_id": 1})]
+    
+    total_reviews = 0
+    for business_id in business_ids:
+        total_reviews += rebuild_buckets(db, business_id)
+    
+    print(f"✓ Bucketed {total_reviews} reviews for {len(business_ids)} businesses")
+    print()
+    print("Set REVIEW_STORAGE=buckets to serve review feeds from the buckets.")
+
+if __name__ == "__main__":
+    main()
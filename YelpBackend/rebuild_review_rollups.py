@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+from utils.storage import get_storage
+from utils.review_rollups import ensure_rollup_indexes, rebuild_review_rollups
+
+def main():
+    storage = get_storage()
+    
+    ensure_rollup_indexes(storage)
+    total_reviews, total_rollups = rebuild_review_rollups(storage)
+    
+    print(f"✓ Rebuilt {total_rollups} review rollups from {total_reviews} reviews")
+
+if __name__ == "__main__":
+    main()
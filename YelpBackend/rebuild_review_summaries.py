@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+import argparse
+from utils.storage import get_storage
+from utils.helpers import validate_object_id
+from utils.review_summary import rebuild_review_summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the embedded latest reviews and star histogram of businesses")
+    parser.add_argument('--business', help="Only rebuild this business ID")
+    args = parser.parse_args()
+    
+    storage = get_storage()
+    
+    if args.business:
+        business_id = validate_object_id(args.business)
+        if not business_id:
+            print(f"Error: invalid business ID {args.business}")
+            return
+        business_ids = [business_id]
+    else:
+        business_ids = [business['_id'] for business in storage.businesses.all({"_id": 1})]
+    
+    total_reviews = 0
+    for business_id in business_ids:
+        total_reviews += rebuild_review_summary(storage, business_id)
+    
+    print(f"✓ Rebuilt review summaries for {len(business_ids)} businesses ({total_reviews} reviews)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import time
+from flask import Blueprint, request, Response
+from config import Config
+from utils.helpers import error_response, success_response
+from utils.decorators import admin_required
+from utils.cache import caches
+from utils.singleflight import flights
+from utils.profiling import recent_profiles, find_profile, profiling_enabled, sign_profile_token, PROFILE_HEADER
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/profiles', methods=['GET'])
+@admin_required()
+def list_profiles():
+    try:
+        return success_response({
+            "enabled": profiling_enabled(),
+            "sampleRate": Config.PROFILE_SAMPLE_RATE,
+            "profiles": recent_profiles()
+        })
+    except Exception as e:
+        return error_response(f"Failed to list profiles: {str(e)}", 500)
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required()
+def get_profile(profile_id):
+    try:
+        profile = find_profile(profile_id)
+        if not profile:
+            return error_response("Profile not found", 404)
+        
+        try:
+            limit = int(request.args.get('limit', 25))
+        except ValueError:
+            return error_response("limit must be a number", 400)
+        if limit < 1:
+            return error_response("limit must be at least 1", 400)
+        
+        return success_response({
+            "profile": profile.summary(),
+            "mongoCommands": profile.mongo_commands,
+            "topFunctions": profile.top_functions(limit)
+        })
+    except Exception as e:
+        return error_response(f"Failed to fetch profile: {str(e)}", 500)
+
+@admin_bp.route('/profiles/<profile_id>/pstats', methods=['GET'])
+@admin_required()
+def download_pstats(profile_id):
+    try:
+        profile = find_profile(profile_id)
+        if not profile:
+            return error_response("Profile not found", 404)
+        
+        return Response(
+            profile.pstats_dump(),
+            mimetype='application/octet-stream',
+            headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.pstats"}
+        )
+    except Exception as e:
+        return error_response(f"Failed to export profile: {str(e)}", 500)
+
+@admin_bp.route('/profiles/<profile_id>/flamegraph', methods=['GET'])
+@admin_required()
+def download_flamegraph(profile_id):
+    try:
+        profile = find_profile(profile_id)
+        if not profile:
+            return error_response("Profile not found", 404)
+        
+        return Response(
+            profile.folded_stacks(),
+            mimetype='text/plain',
+            headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.folded"}
+        )
+    except Exception as e:
+        return error_response(f"Failed to export profile: {str(e)}", 500)
+
+@admin_bp.route('/profiles/token', methods=['POST'])
+@admin_required()
+def create_profile_token():
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if not data.get('path'):
+            return error_response("path is required", 400)
+        
+        try:
+            ttl = int(data.get('ttl', 300))
+        except (TypeError, ValueError):
+            return error_response("ttl must be a number", 400)
+        if ttl < 1:
+            return error_response("ttl must be at least 1", 400)
+        
+        method = str(data.get('method', 'GET'))
+        expires_at = int(time.time()) + ttl
+        
+        return success_response({
+            "header": PROFILE_HEADER,
+            "value": sign_profile_token(method, data['path'], expires_at),
+            "method": method.upper(),
+            "path": data['path'],
+            "expiresAt": expires_at
+        })
+    except Exception as e:
+        return error_response(f"Failed to create profile token: {str(e)}", 500)
+
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required()
+def get_metrics():
+    try:
+        return success_response({
+            "singleflight": flights.stats(),
+            "caches": {cache.name: cache.stats() for cache in caches}
+        })
+    except Exception as e:
+        return error_response(f"Failed to fetch metrics: {str(e)}", 500)
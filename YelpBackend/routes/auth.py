@@ -1,18 +1,13 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
-from config import Config
+from utils.storage import get_storage, DuplicateError
 from utils.helpers import serialize_doc, error_response, success_response
 
 auth_bp = Blueprint('auth', __name__)
 
-def get_db():
-    client = MongoClient(Config.MONGO_URI)
-    return client.get_database()
-
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -21,12 +16,12 @@ def register():
         if not data or not data.get('username') or not data.get('email') or not data.get('password'):
             return error_response("Username, email, and password are required", 400)
         
-        db = get_db()
+        users = get_storage().users
         
-        if db.users.find_one({"email": data['email']}):
+        if users.find_by_email(data['email']):
             return error_response("Email already exists", 409)
         
-        if db.users.find_one({"username": data['username']}):
+        if users.find_by_username(data['username']):
             return error_response("Username already exists", 409)
         
         user = {
@@ -37,8 +32,10 @@ def register():
             "createdAt": datetime.utcnow()
         }
         
-        result = db.users.insert_one(user)
-        user['_id'] = result.inserted_id
+        try:
+            users.create(user)
+        except DuplicateError:
+            return error_response("Email or username already exists", 409)
         
         return success_response({
             "message": "User registered successfully",
@@ -60,8 +57,7 @@ def login():
         if not data or not data.get('email') or not data.get('password'):
             return error_response("Email and password are required", 400)
         
-        db = get_db()
-        user = db.users.find_one({"email": data['email']})
+        user = get_storage().users.find_by_email(data['email'])
         
         if not user or not check_password_hash(user['password'], data['password']):
             return error_response("Invalid email or password", 401)
@@ -86,8 +82,7 @@ def login():
 def get_current_user():
     try:
         current_user_id = get_jwt_identity()
-        db = get_db()
-        user = db.users.find_one({"_id": ObjectId(current_user_id)})
+        user = get_storage().users.get(ObjectId(current_user_id))
         
         if not user:
             return error_response("User not found", 404)
@@ -1,70 +1,188 @@
+import re
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from pymongo import MongoClient
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from config import Config
-from utils.helpers import validate_object_id, serialize_doc, serialize_docs, error_response, success_response
+from utils.db import get_db
+from utils.storage import get_storage
+from utils.helpers import validate_object_id, serialize_doc, serialize_docs, error_response, success_response, parse_fields, build_projection, pick_fields, parse_id_list
 from utils.decorators import admin_required
+from utils.cache import business_cache, review_cache, response_cache, get_many_cached, invalidate_business, business_version
+from utils.singleflight import read_through
+from utils.catalog_snapshot import catalog_snapshot, get_catalog_snapshot
+from utils.suggest_index import MAX_SUGGESTIONS, suggest_index, get_suggest_index
+from utils.review_buckets import buckets_enabled, get_bucket_page, delete_business_buckets
+from utils.review_summary import empty_histogram
+from utils.user_reviews import business_info, schedule_business_info_sync
+from utils.review_rollups import GRANULARITIES, move_business_rollups, delete_business_rollups, get_trend
+from routes.reviews import REVIEW_FIELDS, review_projection, attach_usernames
 
 businesses_bp = Blueprint('businesses', __name__)
 
-def get_db():
-    client = MongoClient(Config.MONGO_URI)
-    return client.get_database()
-
-def update_business_rating(db, business_id):
-    pipeline = [
-        {"$match": {"businessId": business_id}},
-        {"$group": {
-            "_id": "$businessId",
-            "averageRating": {"$avg": "$rating"},
-            "count": {"$sum": 1}
-        }}
-    ]
+BUSINESS_FIELDS = ['name', 'city', 'state', 'address', 'category', 'phone', 'rating', 'reviewCount', 'ratingHistogram', 'latestReviews', 'createdAt']
+DETAIL_INCLUDES = ['reviews', 'stats']
+SUGGEST_TYPES = {'business': 'businesses', 'category': 'categories', 'city': 'cities'}
+
+def listing_projection(fields):
+    if fields is None:
+        return {"latestReviews": 0}
+    return build_projection(fields)
+
+def fetch_business(storage, obj_id):
+    return serialize_doc(storage.businesses.get(obj_id))
+
+def fetch_businesses(storage, obj_ids):
+    return serialize_docs(storage.businesses.get_many(obj_ids))
+
+def query_catalog_snapshot(storage, filters, min_rating, skip, limit, fields):
+    snapshot = get_catalog_snapshot(storage)
+    if snapshot is None:
+        return None
     
-    result = list(db.reviews.aggregate(pipeline))
+    try:
+        total, obj_ids = snapshot.query(filters, min_rating, skip, limit)
+    except re.error:
+        return None
     
-    if result:
-        db.businesses.update_one(
-            {"_id": business_id},
-            {
-                "$set": {
-                    "rating": round(result[0]['averageRating'], 1),
-                    "reviewCount": result[0]['count']
-                }
-            }
-        )
+    found = get_many_cached(business_cache, obj_ids, lambda ids: fetch_businesses(storage, ids))
+    businesses = []
+    for obj_id in obj_ids:
+        business = found.get(str(obj_id))
+        if not business:
+            continue
+        business = pick_fields(dict(business), fields)
+        if fields is None:
+            business.pop('latestReviews', None)
+        businesses.append(business)
+    return total, businesses
+
+def parse_trend_range(args):
+    granularity = args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    
+    period = timedelta(days=7 if granularity == 'week' else 1)
+    try:
+        end = datetime.strptime(args['to'], '%Y-%m-%d') if args.get('to') else datetime.utcnow()
+        start = datetime.strptime(args['from'], '%Y-%m-%d') if args.get('from') else end - period * 29
+    except ValueError:
+        raise ValueError("from and to must be dates in YYYY-MM-DD format")
+    
+    if start > end:
+        raise ValueError("from must not be after to")
+    if (end - start) // period >= Config.TREND_MAX_PERIODS:
+        raise ValueError(f"Range is limited to {Config.TREND_MAX_PERIODS} periods")
+    return granularity, start, end
+
+def load_business_details(storage, business_id, projection, include, review_fields, review_limit):
+    inline_reviews = 'reviews' in include and not buckets_enabled()
+    business = storage.businesses.get_details(
+        business_id,
+        projection,
+        review_limit=review_limit if inline_reviews else 0,
+        review_projection=review_projection(review_fields),
+        with_usernames=review_fields is None or 'username' in review_fields,
+        with_histogram='stats' in include
+    )
+    if not business:
+        return None
+    
+    if 'stats' in include:
+        business['ratingHistogram'] = dict(empty_histogram(), **business['ratingHistogram'])
+    
+    if 'reviews' in include and buckets_enabled():
+        reviews = get_bucket_page(get_db(), business_id, business.get('reviewCount', 0), 0, review_limit)
+        if reviews is None:
+            reviews = attach_usernames(storage, storage.reviews.list_for_business(business_id, 0, review_limit))
+        business['reviews'] = reviews
+    return business
+
+def get_business_details(storage, business_id, fields, include, review_fields, review_limit):
+    projection = build_projection(fields)
+    if projection is not None:
+        projection.update({"rating": 1, "reviewCount": 1, "ratingHistogram": 1})
+    embedded_reviews = 'reviews' in include and review_limit <= Config.EMBEDDED_REVIEW_COUNT
+    
+    if 'reviews' in include and not embedded_reviews:
+        business = load_business_details(storage, business_id, projection, ['reviews'], review_fields, review_limit)
     else:
-        db.businesses.update_one(
-            {"_id": business_id},
-            {"$set": {"rating": 0, "reviewCount": 0}}
-        )
+        summary_projection = projection
+        if projection is not None and embedded_reviews:
+            summary_projection = dict(projection, latestReviews=1, name=1, category=1)
+        business = storage.businesses.get(business_id, summary_projection)
+        if business and embedded_reviews and 'latestReviews' in business:
+            business['reviews'] = [
+                dict(review, businessId=business['_id'], **business_info(business))
+                for review in business['latestReviews'][:review_limit]
+            ]
+    if not business:
+        return None
+    
+    # Documents written before the review summary existed fall back to the aggregation
+    missing = [part for part, key in (('reviews', 'reviews'), ('stats', 'ratingHistogram')) if part in include and key not in business]
+    if missing:
+        loaded = load_business_details(storage, business_id, {"_id": 1}, missing, review_fields, review_limit)
+        if not loaded:
+            return None
+        business.update({key: loaded[key] for key in ('reviews', 'ratingHistogram') if key in loaded})
+    
+    reviews = business.pop('reviews', None)
+    total = business.get('reviewCount', 0)
+    details = {}
+    
+    if 'reviews' in include:
+        if fields is None:
+            business.pop('latestReviews', None)
+        details['reviews'] = [pick_fields(review, review_fields) for review in serialize_docs(reviews)]
+        details['reviewsPagination'] = {
+            "page": 1,
+            "limit": review_limit,
+            "total": total,
+            "pages": (total + review_limit - 1) // review_limit
+        }
+    
+    if 'stats' in include:
+        details['stats'] = {
+            "rating": business.get('rating', 0),
+            "reviewCount": total,
+            "ratingDistribution": dict(empty_histogram(), **business.get('ratingHistogram', {}))
+        }
+    
+    details['business'] = pick_fields(serialize_doc(business), fields)
+    return details
 
 @businesses_bp.route('/', methods=['GET'])
 def get_businesses():
     try:
-        db = get_db()
+        try:
+            fields = parse_fields(request.args.get('fields'), BUSINESS_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        storage = get_storage()
         
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         skip = (page - 1) * limit
         
         rating_filter = request.args.get('rating')
-        query = {}
+        min_rating = None
         
         if rating_filter:
             try:
                 min_rating = float(rating_filter)
-                query['rating'] = {"$gte": min_rating}
             except ValueError:
                 pass
         
-        total = db.businesses.count_documents(query)
-        businesses = list(db.businesses.find(query).skip(skip).limit(limit))
+        listing = query_catalog_snapshot(storage, {}, min_rating, skip, limit, fields)
+        if listing is None:
+            total, businesses = storage.businesses.search({}, min_rating, skip, limit, listing_projection(fields))
+            listing = total, serialize_docs(businesses)
+        total, businesses = listing
         
         return success_response({
-            "businesses": serialize_docs(businesses),
+            "businesses": businesses,
             "pagination": {
                 "page": page,
                 "limit": limit,
@@ -78,7 +196,12 @@ def get_businesses():
 @businesses_bp.route('/search', methods=['GET'])
 def search_businesses():
     try:
-        db = get_db()
+        try:
+            fields = parse_fields(request.args.get('fields'), BUSINESS_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        storage = get_storage()
         
         name = request.args.get('name', '')
         city = request.args.get('city', '')
@@ -86,20 +209,11 @@ def search_businesses():
         category = request.args.get('category', '')
         rating_filter = request.args.get('rating')
         
-        query = {}
-        
-        if name:
-            query['name'] = {"$regex": name, "$options": "i"}
-        if city:
-            query['city'] = {"$regex": city, "$options": "i"}
-        if state:
-            query['state'] = {"$regex": state, "$options": "i"}
-        if category:
-            query['category'] = {"$regex": category, "$options": "i"}
+        filters = {field: value for field, value in [('name', name), ('city', city), ('state', state), ('category', category)] if value}
+        min_rating = None
         if rating_filter:
             try:
                 min_rating = float(rating_filter)
-                query['rating'] = {"$gte": min_rating}
             except ValueError:
                 pass
         
@@ -107,11 +221,16 @@ def search_businesses():
         limit = int(request.args.get('limit', 20))
         skip = (page - 1) * limit
         
-        total = db.businesses.count_documents(query)
-        businesses = list(db.businesses.find(query).skip(skip).limit(limit))
+        listing = None
+        if not name:
+            listing = query_catalog_snapshot(storage, filters, min_rating, skip, limit, fields)
+        if listing is None:
+            total, businesses = storage.businesses.search(filters, min_rating, skip, limit, listing_projection(fields))
+            listing = total, serialize_docs(businesses)
+        total, businesses = listing
         
         return success_response({
-            "businesses": serialize_docs(businesses),
+            "businesses": businesses,
             "pagination": {
                 "page": page,
                 "limit": limit,
@@ -122,6 +241,100 @@ def search_businesses():
     except Exception as e:
         return error_response(f"Search failed: {str(e)}", 500)
 
+@businesses_bp.route('/suggest', methods=['GET'])
+def suggest_businesses():
+    try:
+        prefix = request.args.get('q', '').strip()
+        if not prefix:
+            return error_response("q is required", 400)
+        
+        try:
+            kinds = parse_fields(request.args.get('types'), list(SUGGEST_TYPES)) or list(SUGGEST_TYPES)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        limit = max(min(int(request.args.get('limit', 10)), MAX_SUGGESTIONS), 1)
+        
+        index = get_suggest_index(get_storage())
+        results = index.suggest(prefix, kinds, limit)
+        
+        response = {"query": prefix}
+        for kind in kinds:
+            response[SUGGEST_TYPES[kind]] = results[kind]
+        return success_response(response)
+    except Exception as e:
+        return error_response(f"Suggest failed: {str(e)}", 500)
+
+@businesses_bp.route('/batch', methods=['GET'])
+def get_businesses_batch():
+    try:
+        try:
+            id_strings = parse_id_list(request.args.get('ids'), Config.BATCH_MAX_IDS)
+            fields = parse_fields(request.args.get('fields'), BUSINESS_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        obj_ids = list({obj_id for obj_id in map(validate_object_id, id_strings) if obj_id})
+        found = {}
+        if obj_ids:
+            storage = get_storage()
+            found = get_many_cached(business_cache, obj_ids, lambda ids: fetch_businesses(storage, ids))
+        
+        results = []
+        for id_string in id_strings:
+            obj_id = validate_object_id(id_string)
+            if not obj_id:
+                results.append({"id": id_string, "error": "Invalid business ID"})
+            elif str(obj_id) in found:
+                results.append({"id": id_string, "business": pick_fields(dict(found[str(obj_id)]), fields)})
+            else:
+                results.append({"id": id_string, "error": "Business not found"})
+        
+        return success_response({
+            "results": results,
+            "found": sum(1 for result in results if 'business' in result),
+            "requested": len(id_strings)
+        })
+    except Exception as e:
+        return error_response(f"Failed to fetch businesses: {str(e)}", 500)
+
+@businesses_bp.route('/categories/<category>/trend', methods=['GET'])
+def get_category_trend(category):
+    try:
+        try:
+            granularity, start, end = parse_trend_range(request.args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        trend = get_trend(get_storage(), 'category', category, granularity, start, end)
+        
+        return success_response({"category": category, **trend})
+    except Exception as e:
+        return error_response(f"Failed to fetch trend: {str(e)}", 500)
+
+@businesses_bp.route('/<business_id>/trend', methods=['GET'])
+def get_business_trend(business_id):
+    try:
+        obj_id = validate_object_id(business_id)
+        if not obj_id:
+            return error_response("Invalid business ID", 400)
+        
+        try:
+            granularity, start, end = parse_trend_range(request.args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        storage = get_storage()
+        business = storage.businesses.get(obj_id, {"name": 1, "category": 1})
+        if not business:
+            return error_response("Business not found", 404)
+        
+        trend = get_trend(storage, 'business', obj_id, granularity, start, end)
+        
+        return success_response({"business": serialize_doc(business), **trend})
+    except Exception as e:
+        return error_response(f"Failed to fetch trend: {str(e)}", 500)
+
 @businesses_bp.route('/<business_id>', methods=['GET'])
 def get_business(business_id):
     try:
@@ -129,13 +342,29 @@ def get_business(business_id):
         if not obj_id:
             return error_response("Invalid business ID", 400)
         
-        db = get_db()
-        business = db.businesses.find_one({"_id": obj_id})
+        try:
+            fields = parse_fields(request.args.get('fields'), BUSINESS_FIELDS)
+            review_fields = parse_fields(request.args.get('review_fields'), REVIEW_FIELDS)
+            include = parse_fields(request.args.get('include'), DETAIL_INCLUDES) or []
+        except ValueError as e:
+            return error_response(str(e), 400)
         
-        if not business:
+        storage = get_storage()
+        
+        if not include:
+            business = read_through(business_cache, str(obj_id), lambda: fetch_business(storage, obj_id))
+            if not business:
+                return error_response("Business not found", 404)
+            return success_response({"business": pick_fields(dict(business), fields)})
+        
+        review_limit = max(min(int(request.args.get('review_limit', Config.EMBEDDED_REVIEW_COUNT)), 100), 1)
+        cache_key = ('details', str(obj_id), business_version(obj_id), tuple(include), fields and tuple(fields), review_fields and tuple(review_fields), review_limit)
+        details = read_through(response_cache, cache_key, lambda: get_business_details(storage, obj_id, fields, include, review_fields, review_limit))
+        
+        if not details:
             return error_response("Business not found", 404)
         
-        return success_response({"business": serialize_doc(business)})
+        return success_response(details)
     except Exception as e:
         return error_response(f"Failed to fetch business: {str(e)}", 500)
 
@@ -150,7 +379,7 @@ def create_business():
             if not data.get(field):
                 return error_response(f"{field} is required", 400)
         
-        db = get_db()
+        storage = get_storage()
         
         business = {
             "name": data['name'],
@@ -161,11 +390,14 @@ def create_business():
             "phone": data.get('phone', ''),
             "rating": 0,
             "reviewCount": 0,
+            "ratingHistogram": empty_histogram(),
+            "latestReviews": [],
             "createdAt": datetime.utcnow()
         }
         
-        result = db.businesses.insert_one(business)
-        business['_id'] = result.inserted_id
+        storage.businesses.create(business)
+        suggest_index.add_business(business)
+        catalog_snapshot.refresh(storage)
         
         return success_response({
             "message": "Business created successfully",
@@ -183,9 +415,9 @@ def update_business(business_id):
             return error_response("Invalid business ID", 400)
         
         data = request.get_json()
-        db = get_db()
+        storage = get_storage()
         
-        business = db.businesses.find_one({"_id": obj_id})
+        business = storage.businesses.get(obj_id)
         if not business:
             return error_response("Business not found", 404)
         
@@ -197,9 +429,18 @@ def update_business(business_id):
                 update_data[field] = data[field]
         
         if update_data:
-            db.businesses.update_one({"_id": obj_id}, {"$set": update_data})
+            storage.businesses.update(obj_id, update_data)
+            invalidate_business(obj_id)
+            
+            if update_data.get('category', business.get('category')) != business.get('category'):
+                move_business_rollups(storage, obj_id, business.get('category'), update_data['category'])
         
-        updated_business = db.businesses.find_one({"_id": obj_id})
+        updated_business = storage.businesses.get(obj_id)
+        suggest_index.update_business(updated_business)
+        if any(update_data.get(field, business.get(field)) != business.get(field) for field in ['name', 'category']):
+            schedule_business_info_sync(storage, obj_id)
+        if any(field in update_data for field in ['city', 'state', 'category']):
+            catalog_snapshot.refresh(storage)
         
         return success_response({
             "message": "Business updated successfully",
@@ -216,14 +457,21 @@ def delete_business(business_id):
         if not obj_id:
             return error_response("Invalid business ID", 400)
         
-        db = get_db()
+        storage = get_storage()
         
-        business = db.businesses.find_one({"_id": obj_id})
+        business = storage.businesses.get(obj_id)
         if not business:
             return error_response("Business not found", 404)
         
-        db.reviews.delete_many({"businessId": obj_id})
-        db.businesses.delete_one({"_id": obj_id})
+        delete_business_rollups(storage, obj_id, business.get('category'))
+        storage.reviews.delete_for_business(obj_id)
+        if buckets_enabled():
+            delete_business_buckets(get_db(), obj_id)
+        storage.businesses.delete(obj_id)
+        invalidate_business(obj_id)
+        review_cache.clear()
+        suggest_index.remove_business(obj_id)
+        catalog_snapshot.remove_business(storage, obj_id)
         
         return success_response({"message": "Business and associated reviews deleted successfully"})
     except Exception as e:
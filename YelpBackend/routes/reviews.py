@@ -1,45 +1,102 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
 from config import Config
-from utils.helpers import validate_object_id, serialize_doc, serialize_docs, error_response, success_response
+from utils.db import get_db
+from utils.storage import get_storage, DuplicateError
+from utils.helpers import validate_object_id, serialize_doc, serialize_docs, error_response, success_response, parse_fields, build_projection, pick_fields, parse_id_list
 from utils.decorators import admin_required
+from utils.cache import review_cache, response_cache, get_many_cached, invalidate_business, business_version
+from utils.singleflight import read_through
+from utils.catalog_snapshot import catalog_snapshot
+from utils.suggest_index import suggest_index
+from utils.review_summary import add_review_to_summary, update_review_in_summary, remove_review_from_summary
+from utils.review_rollups import business_category, add_review_to_rollups, update_review_in_rollups, remove_review_from_rollups
+from utils.user_reviews import business_info
+from utils.review_buckets import buckets_enabled, add_review_to_bucket, update_review_in_bucket, remove_review_from_bucket, get_bucket_page
 
 reviews_bp = Blueprint('reviews', __name__)
 
-def get_db():
-    client = MongoClient(Config.MONGO_URI)
-    return client.get_database()
+REVIEW_FIELDS = ['businessId', 'businessName', 'businessCategory', 'userId', 'username', 'rating', 'text', 'createdAt']
 
-def update_business_rating(db, business_id):
-    pipeline = [
-        {"$match": {"businessId": business_id}},
-        {"$group": {
-            "_id": "$businessId",
-            "averageRating": {"$avg": "$rating"},
-            "count": {"$sum": 1}
-        }}
-    ]
+def update_business_rating(storage, business_id):
+    average_rating, review_count = storage.reviews.rating_stats(business_id)
+    rating = round(average_rating, 1) if review_count else 0
     
-    result = list(db.reviews.aggregate(pipeline))
+    storage.businesses.set_rating(business_id, rating, review_count)
     
-    if result:
-        db.businesses.update_one(
-            {"_id": business_id},
-            {
-                "$set": {
-                    "rating": round(result[0]['averageRating'], 1),
-                    "reviewCount": result[0]['count']
-                }
-            }
-        )
-    else:
-        db.businesses.update_one(
-            {"_id": business_id},
-            {"$set": {"rating": 0, "reviewCount": 0}}
-        )
+    invalidate_business(business_id)
+    suggest_index.update_stats(business_id, rating, review_count)
+    catalog_snapshot.update_stats(storage, business_id, rating, review_count)
+
+def business_hint():
+    """The optional businessId query parameter, which lets review writes find the review on one shard."""
+    business_id = request.args.get('businessId')
+    if not business_id:
+        return None
+    obj_id = validate_object_id(business_id)
+    if not obj_id:
+        raise ValueError("Invalid business ID")
+    return obj_id
+
+def review_projection(fields):
+    if fields is None:
+        return None
+    projection = build_projection([field for field in fields if field != 'username'])
+    if 'username' in fields:
+        projection['userId'] = 1
+    return projection
+
+def attach_usernames(storage, reviews):
+    user_ids = {review['userId'] for review in reviews if 'userId' in review}
+    if not user_ids:
+        return reviews
+    
+    usernames = storage.users.usernames(user_ids)
+    
+    for review in reviews:
+        if review.get('userId') in usernames:
+            review['username'] = usernames[review['userId']]
+    return reviews
+
+def present_reviews(storage, reviews, fields):
+    if fields is None or 'username' in fields:
+        attach_usernames(storage, reviews)
+    return [pick_fields(review, fields) for review in serialize_docs(reviews)]
+
+def fetch_reviews(storage, obj_ids):
+    return serialize_docs(attach_usernames(storage, storage.reviews.get_many(obj_ids)))
+
+def load_review_feed(storage, business_id, page, limit, fields):
+    business = storage.businesses.get(business_id, {"reviewCount": 1})
+    if not business:
+        return None
+    
+    skip = (page - 1) * limit
+    total = business.get('reviewCount')
+    if total is None:
+        total = storage.reviews.count_for_business(business_id)
+    
+    reviews = None
+    if buckets_enabled():
+        reviews = get_bucket_page(get_db(), business_id, total, skip, limit)
+        if reviews is not None:
+            reviews = [pick_fields(review, fields) for review in serialize_docs(reviews)]
+    
+    if reviews is None:
+        reviews = storage.reviews.list_for_business(business_id, skip, limit, review_projection(fields))
+        reviews = present_reviews(storage, reviews, fields)
+    
+    return {
+        "reviews": reviews,
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "pages": (total + limit - 1) // limit
+        }
+    }
 
 @reviews_bp.route('/businesses/<business_id>/reviews', methods=['GET'])
 def get_business_reviews(business_id):
@@ -48,33 +105,22 @@ def get_business_reviews(business_id):
         if not obj_id:
             return error_response("Invalid business ID", 400)
         
-        db = get_db()
-        
-        business = db.businesses.find_one({"_id": obj_id})
-        if not business:
-            return error_response("Business not found", 404)
+        try:
+            fields = parse_fields(request.args.get('fields'), REVIEW_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
         
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
-        skip = (page - 1) * limit
         
-        total = db.reviews.count_documents({"businessId": obj_id})
-        reviews = list(db.reviews.find({"businessId": obj_id}).skip(skip).limit(limit).sort("createdAt", -1))
+        storage = get_storage()
+        cache_key = ('reviews', str(obj_id), business_version(obj_id), page, limit, fields and tuple(fields))
+        feed = read_through(response_cache, cache_key, lambda: load_review_feed(storage, obj_id, page, limit, fields))
         
-        for review in reviews:
-            user = db.users.find_one({"_id": review['userId']})
-            if user:
-                review['username'] = user['username']
+        if feed is None:
+            return error_response("Business not found", 404)
         
-        return success_response({
-            "reviews": serialize_docs(reviews),
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "pages": (total + limit - 1) // limit
-            }
-        })
+        return success_response(feed)
     except Exception as e:
         return error_response(f"Failed to fetch reviews: {str(e)}", 500)
 
@@ -99,16 +145,13 @@ def create_review(business_id):
             return error_response("Rating must be a number", 400)
         
         current_user_id = get_jwt_identity()
-        db = get_db()
+        storage = get_storage()
         
-        business = db.businesses.find_one({"_id": obj_id})
+        business = storage.businesses.get(obj_id)
         if not business:
             return error_response("Business not found", 404)
         
-        existing_review = db.reviews.find_one({
-            "businessId": obj_id,
-            "userId": ObjectId(current_user_id)
-        })
+        existing_review = storage.reviews.find_by_user(obj_id, ObjectId(current_user_id))
         
         if existing_review:
             return error_response("You have already reviewed this business", 409)
@@ -118,18 +161,28 @@ def create_review(business_id):
             "userId": ObjectId(current_user_id),
             "rating": rating,
             "text": data['text'],
-            "createdAt": datetime.utcnow()
+            "createdAt": datetime.utcnow(),
+            **business_info(business)
         }
         
-        result = db.reviews.insert_one(review)
-        review['_id'] = result.inserted_id
+        try:
+            storage.reviews.create(review)
+        except DuplicateError:
+            return error_response("You have already reviewed this business", 409)
         
-        update_business_rating(db, obj_id)
+        update_business_rating(storage, obj_id)
         
-        user = db.users.find_one({"_id": ObjectId(current_user_id)})
+        user = storage.users.get(ObjectId(current_user_id))
         if user:
             review['username'] = user['username']
         
+        add_review_to_summary(storage, review)
+        add_review_to_rollups(storage, review, business.get('category'))
+        invalidate_business(obj_id)
+        
+        if buckets_enabled():
+            add_review_to_bucket(get_db(), review)
+        
         return success_response({
             "message": "Review created successfully",
             "review": serialize_doc(review)
@@ -137,6 +190,39 @@ def create_review(business_id):
     except Exception as e:
         return error_response(f"Failed to create review: {str(e)}", 500)
 
+@reviews_bp.route('/reviews/batch', methods=['GET'])
+def get_reviews_batch():
+    try:
+        try:
+            id_strings = parse_id_list(request.args.get('ids'), Config.BATCH_MAX_IDS)
+            fields = parse_fields(request.args.get('fields'), REVIEW_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        obj_ids = list({obj_id for obj_id in map(validate_object_id, id_strings) if obj_id})
+        found = {}
+        if obj_ids:
+            storage = get_storage()
+            found = get_many_cached(review_cache, obj_ids, lambda ids: fetch_reviews(storage, ids))
+        
+        results = []
+        for id_string in id_strings:
+            obj_id = validate_object_id(id_string)
+            if not obj_id:
+                results.append({"id": id_string, "error": "Invalid review ID"})
+            elif str(obj_id) in found:
+                results.append({"id": id_string, "review": pick_fields(dict(found[str(obj_id)]), fields)})
+            else:
+                results.append({"id": id_string, "error": "Review not found"})
+        
+        return success_response({
+            "results": results,
+            "found": sum(1 for result in results if 'review' in result),
+            "requested": len(id_strings)
+        })
+    except Exception as e:
+        return error_response(f"Failed to fetch reviews: {str(e)}", 500)
+
 @reviews_bp.route('/reviews/<review_id>', methods=['GET'])
 def get_review(review_id):
     try:
@@ -144,17 +230,18 @@ def get_review(review_id):
         if not obj_id:
             return error_response("Invalid review ID", 400)
         
-        db = get_db()
-        review = db.reviews.find_one({"_id": obj_id})
+        try:
+            fields = parse_fields(request.args.get('fields'), REVIEW_FIELDS)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
+        storage = get_storage()
+        review = get_many_cached(review_cache, [obj_id], lambda ids: fetch_reviews(storage, ids)).get(str(obj_id))
         
         if not review:
             return error_response("Review not found", 404)
         
-        user = db.users.find_one({"_id": review['userId']})
-        if user:
-            review['username'] = user['username']
-        
-        return success_response({"review": serialize_doc(review)})
+        return success_response({"review": pick_fields(dict(review), fields)})
     except Exception as e:
         return error_response(f"Failed to fetch review: {str(e)}", 500)
 
@@ -166,16 +253,21 @@ def update_review(review_id):
         if not obj_id:
             return error_response("Invalid review ID", 400)
         
+        try:
+            business_id = business_hint()
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
         data = request.get_json()
         current_user_id = get_jwt_identity()
         
-        db = get_db()
-        review = db.reviews.find_one({"_id": obj_id})
+        storage = get_storage()
+        review = storage.reviews.get(obj_id, business_id=business_id)
         
         if not review:
             return error_response("Review not found", 404)
         
-        user = db.users.find_one({"_id": ObjectId(current_user_id)})
+        user = storage.users.get(ObjectId(current_user_id))
         
         if not user:
             return error_response("User not found", 404)
@@ -198,15 +290,24 @@ def update_review(review_id):
             update_data['text'] = data['text']
         
         if update_data:
-            db.reviews.update_one({"_id": obj_id}, {"$set": update_data})
+            storage.reviews.update(obj_id, update_data, business_id=review['businessId'])
+            review_cache.delete(str(obj_id))
+            
+            update_review_in_summary(storage, review, update_data)
+            if 'rating' in update_data:
+                update_review_in_rollups(storage, review, update_data, business_category(storage, review['businessId']))
+            invalidate_business(review['businessId'])
+            
+            if buckets_enabled():
+                update_review_in_bucket(get_db(), review['businessId'], obj_id, update_data)
             
             if 'rating' in update_data:
-                update_business_rating(db, review['businessId'])
+                update_business_rating(storage, review['businessId'])
         
-        updated_review = db.reviews.find_one({"_id": obj_id})
+        updated_review = storage.reviews.get(obj_id, business_id=review['businessId'])
         
         if updated_review:
-            user = db.users.find_one({"_id": updated_review['userId']})
+            user = storage.users.get(updated_review['userId'])
             if user:
                 updated_review['username'] = user['username']
         
@@ -225,15 +326,20 @@ def delete_review(review_id):
         if not obj_id:
             return error_response("Invalid review ID", 400)
         
+        try:
+            business_id = business_hint()
+        except ValueError as e:
+            return error_response(str(e), 400)
+        
         current_user_id = get_jwt_identity()
-        db = get_db()
+        storage = get_storage()
         
-        review = db.reviews.find_one({"_id": obj_id})
+        review = storage.reviews.get(obj_id, business_id=business_id)
         
         if not review:
             return error_response("Review not found", 404)
         
-        user = db.users.find_one({"_id": ObjectId(current_user_id)})
+        user = storage.users.get(ObjectId(current_user_id))
         
         if not user:
             return error_response("User not found", 404)
@@ -243,9 +349,17 @@ def delete_review(review_id):
         
         business_id = review['businessId']
         
-        db.reviews.delete_one({"_id": obj_id})
+        storage.reviews.delete(obj_id, business_id=business_id)
+        review_cache.delete(str(obj_id))
+        
+        remove_review_from_summary(storage, review)
+        remove_review_from_rollups(storage, review, business_category(storage, business_id))
+        invalidate_business(business_id)
+        
+        if buckets_enabled():
+            remove_review_from_bucket(get_db(), business_id, obj_id)
         
-        update_business_rating(db, business_id)
+        update_business_rating(storage, business_id)
         
         return success_response({"message": "Review deleted successfully"})
     except Exception as e:
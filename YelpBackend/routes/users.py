@@ -0,0 +1,63 @@
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from bson import ObjectId
+from utils.storage import get_storage
+from utils.helpers import validate_object_id, serialize_docs, error_response, success_response, parse_fields, pick_fields
+from utils.user_reviews import BUSINESS_INFO_FIELDS, load_user_reviews
+from routes.reviews import REVIEW_FIELDS, review_projection
+
+users_bp = Blueprint('users', __name__)
+
+def user_reviews_response(user_id):
+    try:
+        fields = parse_fields(request.args.get('fields'), REVIEW_FIELDS)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    
+    limit = max(min(int(request.args.get('limit', 20)), 100), 1)
+    storage = get_storage()
+    
+    user = storage.users.get(user_id, {"username": 1})
+    if not user:
+        return error_response("User not found", 404)
+    
+    projection = review_projection(fields)
+    with_business_info = fields is None or any(field in fields for field in BUSINESS_INFO_FIELDS.values())
+    if projection is not None and with_business_info:
+        projection.update({field: 1 for field in BUSINESS_INFO_FIELDS.values()})
+    
+    try:
+        reviews, next_cursor = load_user_reviews(storage, user_id, request.args.get('cursor'), limit, projection, with_business_info)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    
+    for review in reviews:
+        review['username'] = user['username']
+    
+    return success_response({
+        "user": {"id": str(user['_id']), "username": user['username']},
+        "reviews": [pick_fields(review, fields) for review in serialize_docs(reviews)],
+        "pagination": {
+            "limit": limit,
+            "nextCursor": next_cursor
+        }
+    })
+
+@users_bp.route('/me/reviews', methods=['GET'])
+@jwt_required()
+def get_my_reviews():
+    try:
+        return user_reviews_response(ObjectId(get_jwt_identity()))
+    except Exception as e:
+        return error_response(f"Failed to fetch reviews: {str(e)}", 500)
+
+@users_bp.route('/<user_id>/reviews', methods=['GET'])
+def get_user_reviews(user_id):
+    try:
+        obj_id = validate_object_id(user_id)
+        if not obj_id:
+            return error_response("Invalid user ID", 400)
+        
+        return user_reviews_response(obj_id)
+    except Exception as e:
+        return error_response(f"Failed to fetch reviews: {str(e)}", 500)
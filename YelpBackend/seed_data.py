@@ -1,175 +1,178 @@
-from pymongo import MongoClient
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 from bson import ObjectId
+from utils.db import get_db
+from utils.storage import get_storage
+from utils.review_buckets import buckets_enabled, ensure_bucket_indexes, rebuild_buckets
+from utils.review_summary import rebuild_review_summary
+from utils.user_reviews import business_info
+from utils.review_rollups import ensure_rollup_indexes, rebuild_review_rollups
 
-MONGO_URI = 'mongodb://localhost:27017/biz_directory'
-
-client = MongoClient(MONGO_URI)
-db = client.get_database()
-
-print("Clearing existing data...")
-db.users.delete_many({})
-db.businesses.delete_many({})
-db.reviews.delete_many({})
-
-print("Creating admin user...")
-admin_user = {
-    "username": "admin",
-    "email": "admin@bizdirectory.com",
-    "password": generate_password_hash("admin123"),
-    "role": "admin",
-    "createdAt": datetime.utcnow()
-}
-admin_id = db.users.insert_one(admin_user).inserted_id
-print(f"Admin user created: admin@bizdirectory.com / admin123")
-
-print("Creating regular user...")
-user = {
-    "username": "john_doe",
-    "email": "john@example.com",
-    "password": generate_password_hash("password123"),
-    "role": "user",
-    "createdAt": datetime.utcnow()
-}
-user_id = db.users.insert_one(user).inserted_id
-print(f"Regular user created: john@example.com / password123")
-
-print("Creating sample businesses...")
-businesses = [
-    {
-        "name": "Joe's Coffee Shop",
-        "city": "New York",
-        "state": "NY",
-        "address": "123 Broadway Ave",
-        "category": "Coffee & Tea",
-        "phone": "212-555-0100",
-        "rating": 0,
-        "reviewCount": 0,
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "name": "Pizza Palace",
-        "city": "Brooklyn",
-        "state": "NY",
-        "address": "456 5th Street",
-        "category": "Italian Restaurant",
-        "phone": "718-555-0200",
-        "rating": 0,
-        "reviewCount": 0,
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "name": "Tech Repair Shop",
-        "city": "Manhattan",
-        "state": "NY",
-        "address": "789 Tech Ave",
-        "category": "Electronics Repair",
-        "phone": "212-555-0300",
-        "rating": 0,
-        "reviewCount": 0,
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "name": "Green Garden Restaurant",
-        "city": "Los Angeles",
-        "state": "CA",
-        "address": "321 Sunset Blvd",
-        "category": "Vegan Restaurant",
-        "phone": "310-555-0400",
-        "rating": 0,
-        "reviewCount": 0,
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "name": "Book Haven",
-        "city": "San Francisco",
-        "state": "CA",
-        "address": "654 Market Street",
-        "category": "Bookstore",
-        "phone": "415-555-0500",
-        "rating": 0,
-        "reviewCount": 0,
+def seed(storage, log=print):
+    log("Clearing existing data...")
+    storage.users.delete_all()
+    storage.businesses.delete_all()
+    storage.reviews.delete_all()
+    storage.ensure_indexes()
+    
+    log("Creating admin user...")
+    admin_user = {
+        "username": "admin",
+        "email": "admin@bizdirectory.com",
+        "password": generate_password_hash("admin123"),
+        "role": "admin",
         "createdAt": datetime.utcnow()
     }
-]
-
-business_ids = []
-for business in businesses:
-    result = db.businesses.insert_one(business)
-    business_ids.append(result.inserted_id)
-    print(f"Created business: {business['name']}")
-
-print("Creating sample reviews...")
-reviews = [
-    {
-        "businessId": business_ids[0],
-        "userId": user_id,
-        "rating": 5,
-        "text": "Amazing coffee! Best in the city. The baristas are friendly and the atmosphere is cozy.",
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "businessId": business_ids[0],
-        "userId": admin_id,
-        "rating": 4,
-        "text": "Great coffee, but sometimes the wait can be long during morning rush.",
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "businessId": business_ids[1],
-        "userId": user_id,
-        "rating": 5,
-        "text": "Authentic Italian pizza! The margherita is to die for.",
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "businessId": business_ids[2],
-        "userId": admin_id,
-        "rating": 4,
-        "text": "Fixed my phone quickly and at a reasonable price. Highly recommend!",
-        "createdAt": datetime.utcnow()
-    },
-    {
-        "businessId": business_ids[3],
-        "userId": user_id,
-        "rating": 5,
-        "text": "Best vegan food in LA! The quinoa bowl is incredible.",
+    admin_id = storage.users.create(admin_user)
+    log(f"Admin user created: admin@bizdirectory.com / admin123")
+    
+    log("Creating regular user...")
+    user = {
+        "username": "john_doe",
+        "email": "john@example.com",
+        "password": generate_password_hash("password123"),
+        "role": "user",
         "createdAt": datetime.utcnow()
     }
-]
-
-for review in reviews:
-    db.reviews.insert_one(review)
-    print(f"Created review for business ID: {review['businessId']}")
-
-print("\nUpdating business ratings...")
-for business_id in business_ids:
-    pipeline = [
-        {"$match": {"businessId": business_id}},
-        {"$group": {
-            "_id": "$businessId",
-            "averageRating": {"$avg": "$rating"},
-            "count": {"$sum": 1}
-        }}
+    user_id = storage.users.create(user)
+    log(f"Regular user created: john@example.com / password123")
+    
+    log("Creating sample businesses...")
+    businesses = [
+        {
+            "name": "Joe's Coffee Shop",
+            "city": "New York",
+            "state": "NY",
+            "address": "123 Broadway Ave",
+            "category": "Coffee & Tea",
+            "phone": "212-555-0100",
+            "rating": 0,
+            "reviewCount": 0,
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "name": "Pizza Palace",
+            "city": "Brooklyn",
+            "state": "NY",
+            "address": "456 5th Street",
+            "category": "Italian Restaurant",
+            "phone": "718-555-0200",
+            "rating": 0,
+            "reviewCount": 0,
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "name": "Tech Repair Shop",
+            "city": "Manhattan",
+            "state": "NY",
+            "address": "789 Tech Ave",
+            "category": "Electronics Repair",
+            "phone": "212-555-0300",
+            "rating": 0,
+            "reviewCount": 0,
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "name": "Green Garden Restaurant",
+            "city": "Los Angeles",
+            "state": "CA",
+            "address": "321 Sunset Blvd",
+            "category": "Vegan Restaurant",
+            "phone": "310-555-0400",
+            "rating": 0,
+            "reviewCount": 0,
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "name": "Book Haven",
+            "city": "San Francisco",
+            "state": "CA",
+            "address": "654 Market Street",
+            "category": "Bookstore",
+            "phone": "415-555-0500",
+            "rating": 0,
+            "reviewCount": 0,
+            "createdAt": datetime.utcnow()
+        }
     ]
     
-    result = list(db.reviews.aggregate(pipeline))
+    business_ids = []
+    for business in businesses:
+        business_ids.append(storage.businesses.create(business))
+        log(f"Created business: {business['name']}")
+    
+    log("Creating sample reviews...")
+    reviews = [
+        {
+            "businessId": business_ids[0],
+            "userId": user_id,
+            "rating": 5,
+            "text": "Amazing coffee! Best in the city. The baristas are friendly and the atmosphere is cozy.",
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "businessId": business_ids[0],
+            "userId": admin_id,
+            "rating": 4,
+            "text": "Great coffee, but sometimes the wait can be long during morning rush.",
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "businessId": business_ids[1],
+            "userId": user_id,
+            "rating": 5,
+            "text": "Authentic Italian pizza! The margherita is to die for.",
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "businessId": business_ids[2],
+            "userId": admin_id,
+            "rating": 4,
+            "text": "Fixed my phone quickly and at a reasonable price. Highly recommend!",
+            "createdAt": datetime.utcnow()
+        },
+        {
+            "businessId": business_ids[3],
+            "userId": user_id,
+            "rating": 5,
+            "text": "Best vegan food in LA! The quinoa bowl is incredible.",
+            "createdAt": datetime.utcnow()
+        }
+    ]
+    
+    businesses_by_id = {business['_id']: business for business in businesses}
+    for review in reviews:
+        review.update(business_info(businesses_by_id[review['businessId']]))
+        storage.reviews.create(review)
+        log(f"Created review for business ID: {review['businessId']}")
+    
+    log("\nUpdating business ratings...")
+    for business_id in business_ids:
+        average_rating, review_count = storage.reviews.rating_stats(business_id)
+        if review_count:
+            storage.businesses.set_rating(business_id, round(average_rating, 1), review_count)
+    
+    log("Building review summaries...")
+    for business_id in business_ids:
+        rebuild_review_summary(storage, business_id)
+    
+    log("\nBuilding review rollups...")
+    ensure_rollup_indexes(storage)
+    rebuild_review_rollups(storage)
+    
+    if buckets_enabled():
+        log("\nBuilding review buckets...")
+        db = get_db()
+        ensure_bucket_indexes(db)
+        for business_id in business_ids:
+            rebuild_buckets(db, business_id)
     
-    if result:
-        db.businesses.update_one(
-            {"_id": business_id},
-            {
-                "$set": {
-                    "rating": round(result[0]['averageRating'], 1),
-                    "reviewCount": result[0]['count']
-                }
-            }
-        )
+    log("\nSeed data created successfully!")
+    log("\nTest Accounts:")
+    log("  Admin: admin@bizdirectory.com / admin123")
+    log("  User:  john@example.com / password123")
+    log(f"\nTotal Businesses: {len(businesses)}")
+    log(f"Total Reviews: {len(reviews)}")
 
-print("\nSeed data created successfully!")
-print("\nTest Accounts:")
-print("  Admin: admin@bizdirectory.com / admin123")
-print("  User:  john@example.com / password123")
-print(f"\nTotal Businesses: {len(businesses)}")
-print(f"Total Reviews: {len(reviews)}")
+if __name__ == "__main__":
+    seed(get_storage())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+import argparse
+from pymongo import MongoClient
+from config import Config
+from utils.db import get_db
+from utils.mongo_storage import MongoStorage
+from utils.review_buckets import ensure_bucket_indexes
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard the API collections on a cluster reached through mongos at MONGO_URI")
+    parser.add_argument('--add-shard', action='append', default=[], metavar='REPLSET/HOST:PORT', help="Add a shard before sharding (repeatable)")
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    db_name = get_db().name
+    
+    for shard in args.add_shard:
+        client.admin.command("addShard", shard)
+        print(f"Added shard {shard}")
+    
+    storage = MongoStorage()
+    storage.ensure_indexes()
+    ensure_bucket_indexes(storage.db)
+    
+    client.admin.command("enableSharding", db_name)
+    sharded = {collection['_id'] for collection in client.config.collections.find({"_id": {"$regex": f"^{db_name}\\."}}, {"_id": 1})}
+    
+    for collection_name, shard_key in storage.shard_keys().items():
+        namespace = f"{db_name}.{collection_name}"
+        if namespace in sharded:
+            print(f"  {namespace} already sharded")
+            continue
+        if "hashed" in shard_key.values():
+            storage.db[collection_name].create_index(list(shard_key.items()))
+        client.admin.command("shardCollection", namespace, key=shard_key)
+        print(f"✓ Sharded {namespace} on {shard_key}")
+    
+    shards = [shard['_id'] for shard in client.admin.command("listShards")['shards']]
+    print(f"Cluster has {len(shards)} shards: {', '.join(shards)}")
+
+if __name__ == "__main__":
+    main()
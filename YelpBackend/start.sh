@@ -8,5 +8,11 @@ mongod --dbpath data/db --bind_ip 127.0.0.1 --port 27017 --fork --logpath data/m
 echo "Waiting for MongoDB to start..."
 sleep 3
 
-echo "Starting Flask API..."
-python app.py
+if [ "$1" = "dev" ]; then
+    echo "Starting Flask development server..."
+    python app.py
+else
+    echo "Starting Flask API with gunicorn..."
+    export GUNICORN_PIDFILE=${GUNICORN_PIDFILE:-data/gunicorn.pid}
+    exec gunicorn -c gunicorn.conf.py wsgi:app
+fi
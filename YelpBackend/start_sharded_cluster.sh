@@ -0,0 +1,69 @@
+#!/bin/bash
+# Local sharded cluster from plain mongod/mongos processes: one config server
+# replica set, SHARDS single-member shard replica sets and a mongos on port 27017,
+# so the default MONGO_URI reaches the cluster unchanged.
+#
+#   ./start_sharded_cluster.sh          # start (SHARDS=3 ./start_sharded_cluster.sh for more shards)
+#   ./start_sharded_cluster.sh stop
+
+SHARDS=${SHARDS:-2}
+CLUSTER_DIR=${CLUSTER_DIR:-data/cluster}
+MONGOS_PORT=${MONGOS_PORT:-27017}
+CONFIG_PORT=27019
+SHARD_BASE_PORT=27118
+
+if [ "$1" = "stop" ]; then
+    for pidfile in "$CLUSTER_DIR"/*.pid; do
+        [ -f "$pidfile" ] && kill "$(cat "$pidfile")" 2>/dev/null && rm -f "$pidfile"
+    done
+    echo "Cluster stopped"
+    exit 0
+fi
+
+set -e
+
+initiate() {
+    python - "$1" "$2" <<PYTHON
+import sys, time
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+name, port = sys.argv[1], int(sys.argv[2])
+client = MongoClient("localhost", port, directConnection=True)
+config = {"_id": name, "members": [{"_id": 0, "host": f"localhost:{port}"}]}
+if name == "configRS":
+    config["configsvr"] = True
+try:
+    client.admin.command("replSetInitiate", config)
+except OperationFailure as e:
+    if e.code != 23:  # AlreadyInitialized, on a restart with existing data
+        raise
+while not client.admin.command("hello").get("isWritablePrimary"):
+    time.sleep(0.5)
+PYTHON
+}
+
+mkdir -p "$CLUSTER_DIR/config"
+echo "Starting config server on port $CONFIG_PORT..."
+mongod --configsvr --replSet configRS --dbpath "$CLUSTER_DIR/config" --bind_ip 127.0.0.1 --port $CONFIG_PORT \
+    --fork --logpath "$CLUSTER_DIR/config.log" --pidfilepath "$(pwd)/$CLUSTER_DIR/config.pid"
+initiate configRS $CONFIG_PORT
+
+SHARD_ARGS=()
+for i in $(seq 0 $((SHARDS - 1))); do
+    port=$((SHARD_BASE_PORT + i))
+    mkdir -p "$CLUSTER_DIR/shard$i"
+    echo "Starting shard$i on port $port..."
+    mongod --shardsvr --replSet "shard$i" --dbpath "$CLUSTER_DIR/shard$i" --bind_ip 127.0.0.1 --port $port \
+        --fork --logpath "$CLUSTER_DIR/shard$i.log" --pidfilepath "$(pwd)/$CLUSTER_DIR/shard$i.pid"
+    initiate "shard$i" $port
+    SHARD_ARGS+=(--add-shard "shard$i/localhost:$port")
+done
+
+echo "Starting mongos on port $MONGOS_PORT..."
+mongos --configdb "configRS/localhost:$CONFIG_PORT" --bind_ip 127.0.0.1 --port $MONGOS_PORT \
+    --fork --logpath "$CLUSTER_DIR/mongos.log" --pidfilepath "$(pwd)/$CLUSTER_DIR/mongos.pid"
+
+echo "Adding shards and sharding collections..."
+MONGO_URI=${MONGO_URI:-mongodb://localhost:$MONGOS_PORT/biz_directory} python shard_collections.py "${SHARD_ARGS[@]}"
+
+echo "Cluster ready at mongodb://localhost:$MONGOS_PORT"
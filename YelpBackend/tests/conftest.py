@@ -0,0 +1,91 @@
+import os
+import sys
+
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ['MEMORY_SEED'] = '0'
+os.environ['CATALOG_SNAPSHOT'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app import create_app
+from utils import db
+from utils.cache import clear_caches
+from utils.catalog_snapshot import catalog_snapshot
+from utils.singleflight import flights
+from utils.storage import create_storage, set_storage
+from utils.suggest_index import suggest_index
+
+# Every test runs against the memory backend through the Flask test client.
+# Tests that take the `backend` fixture run a second time against the Mongo
+# backend on a mongomock client, when mongomock is installed.
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+def apply_updates(collection, operations, ordered=True):
+    """mongomock rejects the UpdateOne arguments of current pymongo in bulk_write."""
+    for operation in operations:
+        collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+def use_storage(backend, monkeypatch):
+    if backend == 'mongo':
+        if mongomock is None:
+            pytest.skip("mongomock is not installed")
+        monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', apply_updates)
+        monkeypatch.setattr(db, '_client', mongomock.MongoClient('mongodb://localhost:27017/biz_directory_test'))
+        monkeypatch.setattr(db, '_client_pid', os.getpid())
+    storage = create_storage(backend)
+    storage.users.delete_all()
+    storage.businesses.delete_all()
+    storage.reviews.delete_all()
+    storage.ensure_indexes()
+    set_storage(storage)
+    clear_caches()
+    flights.reset()
+    suggest_index.reset()
+    catalog_snapshot.reset()
+    return storage
+
+@pytest.fixture(params=['memory', 'mongo'])
+def backend(request):
+    return request.param
+
+@pytest.fixture
+def storage(backend, monkeypatch):
+    return use_storage(backend, monkeypatch)
+
+@pytest.fixture
+def client(app, storage):
+    return app.test_client()
+
+def register(client, name, password='password123'):
+    response = client.post('/api/auth/register', json={"username": name, "email": f"{name}@example.com", "password": password})
+    assert response.status_code == 201, response.get_json()
+    response = client.post('/api/auth/login', json={"email": f"{name}@example.com", "password": password})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+def register_admin(client, storage, name='admin'):
+    headers = register(client, name)
+    user = storage.users.find_by_username(name)
+    storage.users.update(user['_id'], {"role": "admin"})
+    return headers
+
+def create_business(client, headers, name="Joe's Coffee Shop", **fields):
+    data = {"name": name, "city": "New York", "state": "NY", "address": "1 Main Street", "category": "Coffee & Tea"}
+    data.update(fields)
+    response = client.post('/api/businesses/', json=data, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['business']['_id']
+
+def create_review(client, headers, business_id, rating, text="Nice place"):
+    response = client.post(f'/api/businesses/{business_id}/reviews', json={"rating": rating, "text": text}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['review']['_id']
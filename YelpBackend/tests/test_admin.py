@@ -0,0 +1,54 @@
+import time
+from config import Config
+from conftest import register, register_admin
+from utils.profiling import PROFILE_HEADER, finish_profile, sign_profile_token, start_profile
+
+def test_admin_endpoints_require_admin(client):
+    assert client.get('/api/admin/metrics', headers=register(client, 'user')).status_code == 403
+
+def test_profile_token_validates_ttl(client, storage):
+    headers = register_admin(client, storage)
+    for ttl in ["soon", 0, None]:
+        response = client.post('/api/admin/profiles/token', json={"path": "/api/businesses/", "ttl": ttl}, headers=headers)
+        assert response.status_code == 400
+    
+    response = client.post('/api/admin/profiles/token', json={"path": "/api/businesses/", "ttl": 60}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['method'] == 'GET'
+
+def test_metrics(client, storage):
+    response = client.get('/api/admin/metrics', headers=register_admin(client, storage))
+    assert response.status_code == 200
+    assert 'singleflight' in response.get_json()
+
+def record_profile(app, path):
+    """Profile one request the way a worker does, without serving it through the test client."""
+    token = sign_profile_token('GET', path, int(time.time()) + 60)
+    with app.test_request_context(path, headers={PROFILE_HEADER: token}):
+        start_profile()
+        sum(range(1000))
+        finish_profile()
+
+def test_profiles_are_shared_through_the_profile_directory(app, client, storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'PROFILE_BUFFER_SIZE', 2)
+    headers = register_admin(client, storage)
+    for path in ['/api/businesses/one', '/api/businesses/two', '/api/businesses/three']:
+        record_profile(app, path)
+        time.sleep(0.01)
+    
+    listed = client.get('/api/admin/profiles', headers=headers).get_json()['profiles']
+    assert [profile['path'] for profile in listed] == ['/api/businesses/three', '/api/businesses/two']
+    assert len({profile['id'] for profile in listed}) == 2
+    assert len(list(tmp_path.iterdir())) == 4
+    
+    profile_id = listed[0]['id']
+    response = client.get(f'/api/admin/profiles/{profile_id}', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['profile']['reason'] == 'token'
+    assert 'cumulative' in response.get_json()['topFunctions']
+    assert client.get(f'/api/admin/profiles/{profile_id}/pstats', headers=headers).status_code == 200
+    assert client.get(f'/api/admin/profiles/{profile_id}/flamegraph', headers=headers).status_code == 200
+    
+    assert client.get('/api/admin/profiles/0123456789abcdef', headers=headers).status_code == 404
+    assert client.get('/api/admin/profiles/..%2Fsecret', headers=headers).status_code == 404
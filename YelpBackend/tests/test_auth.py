@@ -0,0 +1,26 @@
+import pytest
+from conftest import register
+from utils.storage import DuplicateError
+
+def test_register_rejects_duplicate_email(client):
+    register(client, 'alice')
+    response = client.post('/api/auth/register', json={"username": "alice2", "email": "alice@example.com", "password": "x"})
+    assert response.status_code == 409
+
+def test_register_rejects_duplicate_username(client):
+    register(client, 'alice')
+    response = client.post('/api/auth/register', json={"username": "alice", "email": "other@example.com", "password": "x"})
+    assert response.status_code == 409
+
+def test_storage_enforces_unique_users(storage):
+    storage.users.create({"username": "bob", "email": "bob@example.com", "role": "user"})
+    with pytest.raises(DuplicateError):
+        storage.users.create({"username": "bob", "email": "bob2@example.com", "role": "user"})
+    with pytest.raises(DuplicateError):
+        storage.users.create({"username": "bob2", "email": "bob@example.com", "role": "user"})
+
+def test_login_and_me(client):
+    headers = register(client, 'carol')
+    response = client.get('/api/auth/me', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['user']['username'] == 'carol'
@@ -0,0 +1,229 @@
+import threading
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config import Config
+from conftest import register, register_admin, create_business, create_review
+from utils.catalog_snapshot import catalog_snapshot, load_catalog, write_snapshot
+from utils.db import get_db
+
+def test_listing_pagination(client):
+    headers = register(client, 'owner')
+    for i in range(5):
+        create_business(client, headers, name=f"Business {i}")
+    
+    pages = [client.get(f'/api/businesses/?page={page}&limit=2').get_json() for page in (1, 2, 3)]
+    assert pages[0]['pagination'] == {"page": 1, "limit": 2, "total": 5, "pages": 3}
+    names = [business['name'] for page in pages for business in page['businesses']]
+    assert sorted(names) == [f"Business {i}" for i in range(5)]
+
+def test_details_default_page_matches_larger_page(client, backend):
+    if backend == 'mongo':
+        pytest.skip("mongomock does not support $lookup sub-pipelines")
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    for i in range(3):
+        create_review(client, register(client, f'user{i}'), business_id, i + 3)
+    
+    default = client.get(f'/api/businesses/{business_id}?include=reviews,stats').get_json()
+    larger = client.get(f'/api/businesses/{business_id}?include=reviews,stats&review_limit=50').get_json()
+    assert default['reviewsPagination']['limit'] == Config.EMBEDDED_REVIEW_COUNT
+    assert default['stats'] == larger['stats']
+    assert default['reviews'] == larger['reviews']
+
+def test_details_clamps_review_limit(client, backend):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    create_review(client, owner, business_id, 4)
+    
+    cases = [(0, 1), (-5, 1)]
+    if backend == 'memory':
+        cases.append((1000, 100))
+    for review_limit, expected in cases:
+        response = client.get(f'/api/businesses/{business_id}?include=reviews&review_limit={review_limit}')
+        assert response.status_code == 200
+        assert response.get_json()['reviewsPagination']['limit'] == expected
+
+def test_suggest_ranks_by_rating(client):
+    owner = register(client, 'owner')
+    low = create_business(client, owner, name="Cafe Low")
+    high = create_business(client, owner, name="Cafe High")
+    create_review(client, owner, low, 2)
+    create_review(client, owner, high, 5)
+    
+    suggestions = client.get('/api/businesses/suggest?q=caf&types=business').get_json()['businesses']
+    assert [suggestion['id'] for suggestion in suggestions] == [high, low]
+
+def test_trend_fills_empty_periods(client):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner, category="Bakery")
+    create_review(client, register(client, 'user1'), business_id, 5)
+    create_review(client, register(client, 'user2'), business_id, 2)
+    today = datetime.utcnow().date()
+    
+    trend = client.get(f'/api/businesses/{business_id}/trend?from={today - timedelta(days=3)}&to={today}').get_json()
+    assert [period['start'] for period in trend['series']] == [str(today - timedelta(days=days)) for days in (3, 2, 1, 0)]
+    assert trend['series'][0] == {"start": str(today - timedelta(days=3)), "count": 0, "averageRating": None, "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}}
+    assert trend['series'][-1]['count'] == 2
+    assert trend['series'][-1]['averageRating'] == 3.5
+    assert trend['totals'] == {"count": 2, "averageRating": 3.5, "histogram": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}}
+    
+    monday = today - timedelta(days=today.weekday())
+    trend = client.get(f'/api/businesses/{business_id}/trend?granularity=week&from={today - timedelta(days=14)}&to={today}').get_json()
+    assert [period['start'] for period in trend['series']] == [str(monday - timedelta(days=days)) for days in (14, 7, 0)]
+    assert [period['count'] for period in trend['series']] == [0, 0, 2]
+
+def test_trend_rejects_bad_ranges(client):
+    business_id = create_business(client, register(client, 'owner'))
+    for query in ['granularity=month', 'from=yesterday', 'from=2024-02-01&to=2024-01-01', 'from=2000-01-01&to=2024-01-01']:
+        assert client.get(f'/api/businesses/{business_id}/trend?{query}').status_code == 400
+    assert client.get(f'/api/businesses/{ObjectId()}/trend').status_code == 404
+
+def test_category_trend_follows_deletes_and_category_moves(client, storage):
+    admin = register_admin(client, storage)
+    business_id = create_business(client, admin, category="Bakery")
+    other_id = create_business(client, admin, name="Other Bakery", category="Bakery")
+    create_review(client, register(client, 'user1'), business_id, 4)
+    create_review(client, register(client, 'user2'), other_id, 2)
+    author = register(client, 'user3')
+    review_id = create_review(client, author, business_id, 5)
+    today = datetime.utcnow().date()
+    
+    def totals(category):
+        return client.get(f'/api/businesses/categories/{category}/trend?from={today}&to={today}').get_json()['totals']
+    
+    assert totals('Bakery')['count'] == 3
+    assert client.delete(f'/api/reviews/{review_id}', headers=author).status_code == 200
+    assert totals('Bakery') == {"count": 2, "averageRating": 3.0, "histogram": {"1": 0, "2": 1, "3": 0, "4": 1, "5": 0}}
+    
+    assert client.put(f'/api/businesses/{business_id}', json={"category": "Diner"}, headers=admin).status_code == 200
+    assert totals('Bakery') == {"count": 1, "averageRating": 2.0, "histogram": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 0}}
+    assert totals('Diner') == {"count": 1, "averageRating": 4.0, "histogram": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}}
+    
+    assert client.delete(f'/api/businesses/{other_id}', headers=admin).status_code == 200
+    assert totals('Bakery')['count'] == 0
+    assert totals('Bakery')['averageRating'] is None
+    assert client.get(f'/api/businesses/{other_id}/trend').status_code == 404
+
+def test_business_batch(client, monkeypatch):
+    owner = register(client, 'owner')
+    first_id = create_business(client, owner, name="First Cafe")
+    second_id = create_business(client, owner, name="Second Cafe")
+    missing_id = str(ObjectId())
+    
+    response = client.get(f'/api/businesses/batch?ids={second_id},bad,{missing_id},{first_id},{second_id}&fields=name')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['requested'] == 5
+    assert data['found'] == 3
+    assert [result.get('business', {}).get('name') or result['error'] for result in data['results']] == [
+        "Second Cafe", "Invalid business ID", "Business not found", "First Cafe", "Second Cafe"
+    ]
+    assert data['results'][0]['business'] == {"_id": second_id, "name": "Second Cafe"}
+    
+    monkeypatch.setattr(Config, 'BATCH_MAX_IDS', 2)
+    assert client.get(f'/api/businesses/batch?ids={first_id},{second_id},{missing_id}').status_code == 400
+    assert client.get('/api/businesses/batch?ids=').status_code == 400
+    assert client.get(f'/api/businesses/batch?ids={first_id}&fields=secret').status_code == 400
+
+def test_review_batch_drops_deleted_reviews(client):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    author = register(client, 'author')
+    kept_id = create_review(client, owner, business_id, 4)
+    deleted_id = create_review(client, author, business_id, 2)
+    
+    def batch():
+        data = client.get(f'/api/reviews/batch?ids={kept_id},{deleted_id}&fields=rating').get_json()
+        return [result.get('review') or result['error'] for result in data['results']]
+    
+    assert batch() == [{"_id": kept_id, "rating": 4}, {"_id": deleted_id, "rating": 2}]
+    assert client.delete(f'/api/reviews/{deleted_id}', headers=author).status_code == 200
+    assert batch() == [{"_id": kept_id, "rating": 4}, "Review not found"]
+
+def test_snapshot_listing_matches_storage(client, storage, tmp_path, monkeypatch):
+    admin = register_admin(client, storage)
+    ids = {}
+    for name, city, category in [("Alpha", "Boston", "Bakery"), ("Beta", "Boston", "Diner"), ("Gamma", "Austin", "Bakery"), ("Delta", "Austin", "Bakery")]:
+        ids[name] = create_business(client, admin, name=name, city=city, category=category)
+    create_review(client, register(client, 'user1'), ids["Gamma"], 5)
+    create_review(client, register(client, 'user2'), ids["Alpha"], 2)
+    queries = ['/api/businesses/?limit=2&page=2', '/api/businesses/?rating=4', '/api/businesses/search?city=boston',
+               '/api/businesses/search?category=bak&city=austin&fields=name', '/api/businesses/search?category=bak&limit=1&page=2']
+    expected = [client.get(query).get_json() for query in queries]
+    
+    monkeypatch.setattr(Config, 'CATALOG_SNAPSHOT', True)
+    monkeypatch.setattr(catalog_snapshot, 'path', str(tmp_path / 'catalog.snapshot'))
+    write_snapshot(catalog_snapshot.path, load_catalog(storage))
+    
+    def no_search(*args, **kwargs):
+        raise AssertionError("listing fell back to storage")
+    monkeypatch.setattr(storage.businesses, 'search', no_search)
+    assert [client.get(query).get_json() for query in queries] == expected
+    
+    create_review(client, register(client, 'user3'), ids["Delta"], 4)
+    assert client.delete(f'/api/businesses/{ids["Gamma"]}', headers=admin).status_code == 200
+    names = [business['name'] for business in client.get('/api/businesses/?rating=4').get_json()['businesses']]
+    assert names == ["Delta"]
+
+def test_delete_business_removes_its_buckets(client, storage, backend, monkeypatch):
+    if backend != 'mongo':
+        pytest.skip("bucketed reviews need the Mongo backend")
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'mongo')
+    monkeypatch.setattr(Config, 'REVIEW_STORAGE', 'buckets')
+    admin = register_admin(client, storage)
+    business_id = create_business(client, admin)
+    kept_id = create_business(client, admin, name="Kept Cafe")
+    create_review(client, register(client, 'user'), business_id, 4)
+    create_review(client, register(client, 'other'), kept_id, 4)
+    
+    assert client.delete(f'/api/businesses/{business_id}', headers=admin).status_code == 200
+    assert get_db().review_buckets.count_documents({"businessId": ObjectId(business_id)}) == 0
+    assert get_db().review_buckets.count_documents({"businessId": ObjectId(kept_id)}) == 1
+
+def delay_reads_in(thread_name, repository, method, monkeypatch):
+    """Hold reads from one thread after they read until `release` is set; `read_done` is set once they read."""
+    read_done = threading.Event()
+    release = threading.Event()
+    read = getattr(repository, method)
+    
+    def delayed(*args, **kwargs):
+        result = read(*args, **kwargs)
+        if threading.current_thread().name == thread_name:
+            read_done.set()
+            release.wait(5)
+        return result
+    
+    monkeypatch.setattr(repository, method, delayed)
+    return read_done, release
+
+def test_read_racing_a_write_is_not_cached(app, client, storage, monkeypatch):
+    admin = register_admin(client, storage)
+    business_id = create_business(client, admin, name="Old Name")
+    read_done, release = delay_reads_in('slow-reader', storage.businesses, 'get', monkeypatch)
+    
+    reader = threading.Thread(target=lambda: app.test_client().get(f'/api/businesses/{business_id}'), name='slow-reader')
+    reader.start()
+    assert read_done.wait(5)
+    response = client.put(f'/api/businesses/{business_id}', json={"name": "New Name"}, headers=admin)
+    assert response.status_code == 200
+    release.set()
+    reader.join()
+    
+    assert client.get(f'/api/businesses/{business_id}').get_json()['business']['name'] == "New Name"
+
+def test_batch_read_racing_a_write_is_not_cached(app, client, storage, monkeypatch):
+    admin = register_admin(client, storage)
+    business_id = create_business(client, admin, name="Old Name")
+    read_done, release = delay_reads_in('slow-reader', storage.businesses, 'get_many', monkeypatch)
+    
+    reader = threading.Thread(target=lambda: app.test_client().get(f'/api/businesses/batch?ids={business_id}'), name='slow-reader')
+    reader.start()
+    assert read_done.wait(5)
+    response = client.put(f'/api/businesses/{business_id}', json={"name": "New Name"}, headers=admin)
+    assert response.status_code == 200
+    release.set()
+    reader.join()
+    
+    batch = client.get(f'/api/businesses/batch?ids={business_id}').get_json()
+    assert batch['results'][0]['business']['name'] == "New Name"
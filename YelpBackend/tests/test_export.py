@@ -0,0 +1,17 @@
+import json
+from export_data import export_collection
+from seed_data import seed
+
+def test_export_seeded_data(storage, tmp_path):
+    seed(storage, log=lambda message: None)
+    
+    for collection_name in ['users', 'businesses', 'reviews']:
+        output_file = tmp_path / f"{collection_name}.json"
+        count = export_collection(storage, collection_name, str(output_file))
+        documents = json.loads(output_file.read_text())
+        assert count == len(documents) > 0
+    
+    businesses = json.loads((tmp_path / "businesses.json").read_text())
+    latest = [review for business in businesses for review in business.get('latestReviews', [])]
+    assert latest
+    assert all(isinstance(review['_id'], str) and isinstance(review['createdAt'], str) for review in latest)
@@ -0,0 +1,173 @@
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config import Config
+from conftest import register, create_business, create_review
+from utils.db import get_db
+from utils.review_buckets import get_bucket_page
+from utils.storage import DuplicateError
+
+def skip_on_mongomock(backend, feature):
+    if backend == 'mongo':
+        pytest.skip(f"mongomock does not support {feature}")
+
+def business_stats(client, business_id):
+    return client.get(f'/api/businesses/{business_id}?include=stats').get_json()['stats']
+
+def test_one_review_per_user_and_business(client, storage):
+    headers = register(client, 'alice')
+    business_id = create_business(client, headers)
+    create_review(client, headers, business_id, 4)
+    
+    response = client.post(f'/api/businesses/{business_id}/reviews', json={"rating": 5, "text": "Again"}, headers=headers)
+    assert response.status_code == 409
+    
+    user_id = storage.users.find_by_email('alice@example.com')['_id']
+    with pytest.raises(DuplicateError):
+        storage.reviews.create({"businessId": ObjectId(business_id), "userId": user_id, "rating": 1, "text": "Raw"})
+
+def test_rating_follows_created_reviews(client):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    review_ids = [create_review(client, register(client, f'user{i}'), business_id, rating) for i, rating in enumerate([5, 4, 2])]
+    
+    stats = business_stats(client, business_id)
+    assert stats['rating'] == 3.7
+    assert stats['reviewCount'] == 3
+    assert stats['ratingDistribution'] == {"1": 0, "2": 1, "3": 0, "4": 1, "5": 1}
+    
+    response = client.delete(f'/api/reviews/{review_ids[2]}', headers=register(client, 'stranger'))
+    assert response.status_code == 403
+    
+    stats = business_stats(client, business_id)
+    assert stats['reviewCount'] == 3
+
+def test_rating_follows_deleted_review(client):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    author = register(client, 'author')
+    create_review(client, owner, business_id, 5)
+    review_id = create_review(client, author, business_id, 1)
+    
+    response = client.delete(f'/api/reviews/{review_id}', headers=author)
+    assert response.status_code == 200
+    
+    stats = business_stats(client, business_id)
+    assert stats == {"rating": 5.0, "reviewCount": 1, "ratingDistribution": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1}}
+    business = client.get(f'/api/businesses/{business_id}').get_json()['business']
+    assert [review['rating'] for review in business['latestReviews']] == [5]
+
+def test_rating_follows_updated_review(client, backend):
+    skip_on_mongomock(backend, "array_filters")
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    review_id = create_review(client, owner, business_id, 2)
+    
+    response = client.put(f'/api/reviews/{review_id}', json={"rating": 4, "text": "Better now"}, headers=owner)
+    assert response.status_code == 200
+    
+    stats = business_stats(client, business_id)
+    assert stats['rating'] == 4.0
+    assert stats['ratingDistribution']['2'] == 0
+    assert stats['ratingDistribution']['4'] == 1
+    details = client.get(f'/api/businesses/{business_id}?include=reviews').get_json()
+    assert [(review['rating'], review['text']) for review in details['reviews']] == [(4, "Better now")]
+
+def test_summary_keeps_newest_reviews(client, storage):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    authors = [register(client, f'user{i}') for i in range(Config.EMBEDDED_REVIEW_COUNT + 2)]
+    review_ids = [create_review(client, headers, business_id, 3, text=f"Review {i}") for i, headers in enumerate(authors)]
+    
+    business = storage.businesses.get(ObjectId(business_id))
+    assert [str(review['_id']) for review in business['latestReviews']] == review_ids[::-1][:Config.EMBEDDED_REVIEW_COUNT]
+    assert sum(business['ratingHistogram'].values()) == len(review_ids)
+    
+    response = client.delete(f'/api/reviews/{review_ids[-1]}', headers=authors[-1])
+    assert response.status_code == 200
+    business = storage.businesses.get(ObjectId(business_id))
+    assert [str(review['_id']) for review in business['latestReviews']] == review_ids[-2::-1][:Config.EMBEDDED_REVIEW_COUNT]
+    
+    details = client.get(f'/api/businesses/{business_id}?include=reviews').get_json()
+    assert [review['_id'] for review in details['reviews']] == review_ids[-2::-1][:Config.EMBEDDED_REVIEW_COUNT]
+    assert details['reviews'][0]['username'] == f'user{len(authors) - 2}'
+    assert details['reviews'][0]['businessName'] == "Joe's Coffee Shop"
+
+def test_review_feed_pagination(client):
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    review_ids = [create_review(client, register(client, f'user{i}'), business_id, 4) for i in range(5)]
+    
+    pages = [client.get(f'/api/businesses/{business_id}/reviews?page={page}&limit=2').get_json() for page in (1, 2, 3)]
+    assert pages[0]['pagination'] == {"page": 1, "limit": 2, "total": 5, "pages": 3}
+    assert [review['_id'] for page in pages for review in page['reviews']] == review_ids[::-1]
+
+def test_bucket_feed_survives_deletes(client, backend, monkeypatch):
+    if backend != 'mongo':
+        pytest.skip("bucketed reviews need the Mongo backend")
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'mongo')
+    monkeypatch.setattr(Config, 'REVIEW_STORAGE', 'buckets')
+    monkeypatch.setattr(Config, 'REVIEW_BUCKET_SIZE', 2)
+    owner = register(client, 'owner')
+    business_id = create_business(client, owner)
+    authors = [register(client, f'user{i}') for i in range(6)]
+    review_ids = [create_review(client, authors[i], business_id, 4, text=f"review {i}") for i in range(5)]
+    
+    for i in [1, 2]:
+        assert client.delete(f'/api/reviews/{review_ids[i]}', headers=authors[i]).status_code == 200
+    create_review(client, authors[5], business_id, 4, text="review 5")
+    
+    buckets = get_db().review_buckets.find({"businessId": ObjectId(business_id)}).sort("start", 1)
+    assert [(bucket['start'], bucket['count']) for bucket in buckets] == [(0, 1), (2, 1), (4, 2)]
+    assert len(get_bucket_page(get_db(), ObjectId(business_id), 4, 0, 3)) == 3
+    
+    texts = []
+    for page in [1, 2]:
+        response = client.get(f'/api/businesses/{business_id}/reviews?page={page}&limit=3')
+        texts.append([review['text'] for review in response.get_json()['reviews']])
+    assert texts == [["review 5", "review 4", "review 3"], ["review 0"]]
+
+def test_user_reviews_keyset_pagination(client):
+    author = register(client, 'author')
+    business_ids = [create_business(client, author, name=f"Business {i}") for i in range(5)]
+    review_ids = [create_review(client, author, business_id, 3) for business_id in business_ids]
+    user_id = client.get('/api/auth/me', headers=author).get_json()['user']['id']
+    
+    seen = []
+    cursor = None
+    while True:
+        query = f'?limit=2&cursor={cursor}' if cursor else '?limit=2'
+        page = client.get(f'/api/users/{user_id}/reviews{query}').get_json()
+        seen.extend(review['_id'] for review in page['reviews'])
+        cursor = page['pagination']['nextCursor']
+        if not cursor:
+            break
+    assert seen == review_ids[::-1]
+    
+    response = client.get(f'/api/users/{user_id}/reviews?cursor=bogus')
+    assert response.status_code == 400
+
+def test_review_writes_accept_business_hint(client):
+    author = register(client, 'author')
+    business_id = create_business(client, author)
+    other_id = create_business(client, author, name="Other Place")
+    review_id = create_review(client, author, business_id, 3)
+    
+    assert client.delete(f'/api/reviews/{review_id}?businessId=bogus', headers=author).status_code == 400
+    assert client.delete(f'/api/reviews/{review_id}?businessId={other_id}', headers=author).status_code == 404
+    assert client.delete(f'/api/reviews/{review_id}?businessId={business_id}', headers=author).status_code == 200
+    assert client.get(f'/api/reviews/{review_id}').status_code == 404
+
+def test_first_review_builds_missing_summary(client, storage):
+    author = register(client, 'author')
+    business_id = storage.businesses.create({"name": "Legacy Diner", "city": "Boston", "state": "MA", "address": "2 Elm Street", "category": "Diner", "rating": 1.7, "reviewCount": 3})
+    for i, rating in enumerate([1, 2, 2]):
+        user_id = storage.users.create({"username": f"old{i}", "email": f"old{i}@example.com", "role": "user"})
+        storage.reviews.create({"businessId": business_id, "userId": user_id, "rating": rating, "text": "Old", "createdAt": datetime.utcnow() - timedelta(days=i + 1)})
+    
+    create_review(client, author, str(business_id), 5)
+    
+    details = client.get(f'/api/businesses/{business_id}?include=reviews,stats').get_json()
+    assert details['stats']['reviewCount'] == 4
+    assert details['stats']['ratingDistribution'] == {"1": 1, "2": 2, "3": 0, "4": 0, "5": 1}
+    assert [review['rating'] for review in details['reviews']] == [5, 1, 2, 2]
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from config import Config
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries are fresh for `ttl` seconds and
+    may then be served stale for another `stale_ttl` seconds while they refresh.
+    
+    Every delete and clear advances a generation. A loader takes the generation
+    before it reads and passes it to set(), which drops the value if its key was
+    deleted meanwhile, so a read that raced a write cannot re-cache the old data.
+    The last `max_entries` deletes are remembered; a load older than those is
+    dropped too."""
+    
+    def __init__(self, name, max_entries=1024, ttl=30, stale_ttl=0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._generation = 0
+        self._deleted = OrderedDict()
+        self._forgotten = 0
+    
+    def generation(self):
+        with self._lock:
+            return self._generation
+    
+    def get(self, key):
+        entry = self.get_entry(key)
+        if entry is None or not entry[1]:
+            return None
+        return entry[0]
+    
+    def get_entry(self, key):
+        """Return (value, is_fresh) for entries still within their stale window, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            value, fresh_until, stale_until = entry
+            now = time.monotonic()
+            if stale_until < now:
+                del self._entries[key]
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            fresh = now <= fresh_until
+            self._counters['hits' if fresh else 'stale_hits'] += 1
+            return value, fresh
+    
+    def get_many(self, keys):
+        hits = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                hits[key] = value
+        return hits
+    
+    def set(self, key, value, since=None):
+        """Store value; with `since`, only if key was not deleted after that generation."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if since is not None and (since < self._forgotten or self._deleted.get(key, 0) > since):
+                self._counters['discarded'] += 1
+                return
+            now = time.monotonic()
+            self._entries[key] = (value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._deleted[key] = self._generation
+            self._deleted.move_to_end(key)
+            if len(self._deleted) > self.max_entries:
+                self._forgotten = self._deleted.popitem(last=False)[1]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._deleted.clear()
+            self._forgotten = self._generation
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._entries), ttl=self.ttl, staleTtl=self.stale_ttl)
+
+business_cache = TTLCache('businesses', Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS, Config.CACHE_STALE_SECONDS)
+review_cache = TTLCache('reviews', Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS, Config.CACHE_STALE_SECONDS)
+response_cache = TTLCache('responses', Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS, Config.CACHE_STALE_SECONDS)
+caches = [business_cache, review_cache, response_cache]
+
+_business_versions = {}
+
+def business_version(business_id):
+    return _business_versions.get(str(business_id), 0)
+
+def invalidate_business(business_id):
+    """Drop the cached business and every cached response derived from it."""
+    business_cache.delete(str(business_id))
+    key = str(business_id)
+    _business_versions[key] = _business_versions.get(key, 0) + 1
+
+def clear_caches():
+    for cache in caches:
+        cache.clear()
+    _business_versions.clear()
+
+def get_many_cached(cache, obj_ids, fetch_many):
+    """Resolve ObjectIds to serialized docs, querying only the ids missing from the cache."""
+    keys = [str(obj_id) for obj_id in obj_ids]
+    found = cache.get_many(keys)
+    missing = [obj_id for obj_id in obj_ids if str(obj_id) not in found]
+    
+    if missing:
+        since = cache.generation()
+        for doc in fetch_many(missing):
+            cache.set(doc['_id'], doc, since)
+            found[doc['_id']] = doc
+    return found
@@ -0,0 +1,330 @@
+import fcntl
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from itertools import compress, islice
+from bson import ObjectId
+from config import Config
+
+# Optional read-only catalog shared by every worker on the host. The snapshot is
+# one file of fixed-width columns (ids in _id order, rating in tenths, review
+# count, a live flag and dictionary codes for city, state and category, each
+# with a posting list of rows per code) that workers mmap, so the data lives
+# once in the page cache however many workers map it. Rating, review count and
+# deletes are patched in place through the shared mapping; new businesses and
+# city/state/category changes rebuild the file in the background, one process
+# at a time, and workers pick up the new file within CATALOG_SNAPSHOT_CHECK_SECONDS.
+#
+# Patches and the swap to a rebuilt file are serialized by a second file lock,
+# which also guards a counter of applied patches. A patch first checks that it
+# maps the file currently at the path. A rebuild loads the catalog again when
+# the counter moved while it was loading, since the new file may miss that patch.
+# Its last attempt holds the lock for the whole load.
+
+MAGIC = b'BIZCAT01'
+HEADER = struct.Struct('<8sdII')
+PATCH_COUNT = struct.Struct('<Q')
+REBUILD_ATTEMPTS = 3
+ID_SIZE = 12
+FILTER_COLUMNS = ['city', 'state', 'category']
+
+def catalog_snapshot_enabled():
+    return Config.CATALOG_SNAPSHOT
+
+def aligned(size):
+    return (size + 7) // 8 * 8
+
+def rating_tenths(rating):
+    return int(round((rating or 0) * 10))
+
+def load_catalog(storage):
+    return storage.businesses.all({"rating": 1, "reviewCount": 1, "city": 1, "state": 1, "category": 1})
+
+def read_patch_count(fd):
+    data = os.pread(fd, PATCH_COUNT.size, 0)
+    return PATCH_COUNT.unpack(data)[0] if len(data) == PATCH_COUNT.size else 0
+
+def write_snapshot(path, businesses, built_at=None):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    count = write_snapshot_file(temp_path, businesses, built_at)
+    os.replace(temp_path, path)
+    return count
+
+def write_snapshot_file(path, businesses, built_at=None):
+    built_at = time.time() if built_at is None else built_at
+    ids = bytearray()
+    values = {column: [] for column in FILTER_COLUMNS}
+    ratings = array('B')
+    review_counts = array('I')
+    for business in businesses:
+        ids += business['_id'].binary
+        ratings.append(rating_tenths(business.get('rating')))
+        review_counts.append(business.get('reviewCount') or 0)
+        for column in FILTER_COLUMNS:
+            values[column].append(str(business.get(column) or ''))
+    count = len(ratings)
+    
+    columns = {
+        "ids": ('B', bytes(ids)),
+        "rating": ('B', ratings),
+        "reviewCount": ('I', review_counts),
+        "live": ('B', bytes([1]) * count)
+    }
+    dictionaries = {}
+    for column in FILTER_COLUMNS:
+        dictionary = sorted(set(values[column]))
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        codes = array('I', (lookup[value] for value in values[column]))
+        offsets = array('I', [0]) * (len(dictionary) + 1)
+        for code in codes:
+            offsets[code + 1] += 1
+        for code in range(len(dictionary)):
+            offsets[code + 1] += offsets[code]
+        
+        dictionaries[column] = dictionary
+        columns[column] = ('I', codes)
+        columns[f"{column}.rows"] = ('I', array('I', sorted(range(count), key=codes.__getitem__)))
+        columns[f"{column}.offsets"] = ('I', offsets)
+    
+    layout = {}
+    position = 0
+    for name, (fmt, data) in columns.items():
+        size = len(memoryview(data).cast('B'))
+        layout[name] = [position, size, fmt]
+        position = aligned(position + size)
+    metadata = json.dumps({"count": count, "dictionaries": dictionaries, "columns": layout}).encode()
+    base = aligned(HEADER.size + len(metadata))
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, built_at, count, len(metadata)))
+        snapshot_file.write(metadata)
+        for name, (fmt, data) in columns.items():
+            snapshot_file.seek(base + layout[name][0])
+            snapshot_file.write(memoryview(data).cast('B'))
+        snapshot_file.truncate(max(base + position, 1))
+    return count
+
+class SnapshotView:
+    """One mapped snapshot file. Column memoryviews point straight into the mapping."""
+    
+    def __init__(self, path):
+        with open(path, 'r+b') as snapshot_file:
+            self.inode = os.fstat(snapshot_file.fileno()).st_ino
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0)
+        
+        magic, self.built_at, self.count, metadata_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        metadata = json.loads(self._mmap[HEADER.size:HEADER.size + metadata_size])
+        base = aligned(HEADER.size + metadata_size)
+        
+        buffer = memoryview(self._mmap)
+        self.dictionaries = metadata['dictionaries']
+        self.columns = {
+            name: buffer[base + offset:base + offset + size].cast(fmt)
+            for name, (offset, size, fmt) in metadata['columns'].items()
+        }
+    
+    def find_row(self, business_id):
+        key = ObjectId(business_id).binary
+        ids = self.columns['ids']
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if ids[middle * ID_SIZE:(middle + 1) * ID_SIZE].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and ids[low * ID_SIZE:(low + 1) * ID_SIZE].tobytes() == key:
+            return low
+        return None
+    
+    def row_id(self, row):
+        return ObjectId(self.columns['ids'][row * ID_SIZE:(row + 1) * ID_SIZE].tobytes())
+    
+    def update_stats(self, business_id, rating, review_count):
+        row = self.find_row(business_id)
+        if row is not None:
+            self.columns['rating'][row] = rating_tenths(rating)
+            self.columns['reviewCount'][row] = review_count
+    
+    def remove(self, business_id):
+        row = self.find_row(business_id)
+        if row is not None:
+            self.columns['live'][row] = 0
+    
+    def matching_codes(self, column, pattern):
+        matcher = re.compile(pattern, re.IGNORECASE)
+        return {code for code, value in enumerate(self.dictionaries[column]) if matcher.search(value)}
+    
+    def posting_rows(self, column, codes):
+        rows = self.columns[f"{column}.rows"]
+        offsets = self.columns[f"{column}.offsets"]
+        return [row for code in codes for row in rows[offsets[code]:offsets[code + 1]]]
+    
+    def posting_size(self, column, codes):
+        offsets = self.columns[f"{column}.offsets"]
+        return sum(offsets[code + 1] - offsets[code] for code in codes)
+    
+    def selector(self, min_rating):
+        """One byte per row: 1 if the row is live and rated at least min_rating."""
+        live = self.columns['live'].tobytes()
+        if min_rating is None:
+            return live
+        threshold = math.ceil(min_rating * 10 - 1e-9)
+        table = bytes(1 if value >= threshold else 0 for value in range(256))
+        rated = self.columns['rating'].tobytes().translate(table)
+        return (int.from_bytes(rated, 'little') & int.from_bytes(live, 'little')).to_bytes(self.count, 'little')
+    
+    def query(self, filters, min_rating, skip, limit):
+        """Return (total, page of ObjectIds) for rows matching every case-insensitive
+        column pattern in filters and rated at least min_rating, in _id order."""
+        selector = self.selector(min_rating)
+        skip = max(skip, 0)
+        
+        if not filters:
+            page = islice(compress(range(self.count), selector), skip, skip + max(limit, 0))
+            return selector.count(1), [self.row_id(row) for row in page]
+        
+        matched = {column: self.matching_codes(column, pattern) for column, pattern in filters.items()}
+        narrowest = min(matched, key=lambda column: self.posting_size(column, matched[column]))
+        others = [(self.columns[column], codes) for column, codes in matched.items() if column != narrowest]
+        selected = [
+            row for row in sorted(self.posting_rows(narrowest, matched[narrowest]))
+            if selector[row] and all(column_codes[row] in codes for column_codes, codes in others)
+        ]
+        return len(selected), [self.row_id(row) for row in selected[skip:skip + limit]]
+
+class CatalogSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self._view = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_requested_at = None
+    
+    def reset(self):
+        with self._lock:
+            self._view = None
+            self._checked_at = None
+            self._rebuild_requested_at = None
+    
+    def view(self, storage):
+        """Return the current mapped snapshot, or None while it is being built."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= Config.CATALOG_SNAPSHOT_CHECK_SECONDS:
+            with self._lock:
+                self._checked_at = now
+                self._reload(storage)
+        return self._view
+    
+    def _reload(self, storage):
+        try:
+            inode = os.stat(self.path).st_ino
+            if self._view is None or self._view.inode != inode:
+                self._view = SnapshotView(self.path)
+        except (OSError, ValueError):
+            self._view = None
+        
+        if self._view is None or time.time() - self._view.built_at > Config.CATALOG_SNAPSHOT_REFRESH_SECONDS:
+            self.schedule_rebuild(storage)
+    
+    def schedule_rebuild(self, storage):
+        """Rebuild the file in the background unless a rebuild is already waiting in this process."""
+        requested_at = time.time()
+        with self._rebuild_lock:
+            if self._rebuild_requested_at is not None:
+                return
+            self._rebuild_requested_at = requested_at
+        threading.Thread(target=self._rebuild, args=(storage, requested_at), daemon=True).start()
+    
+    def _rebuild(self, storage, requested_at):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(f"{self.path}.lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._rebuild_requested_at = None
+                
+                try:
+                    with open(self.path, 'rb') as snapshot_file:
+                        magic, built_at, _, _ = HEADER.unpack(snapshot_file.read(HEADER.size))
+                    if magic == MAGIC and built_at >= requested_at:
+                        return
+                except (OSError, struct.error):
+                    pass
+                
+                self._build(storage)
+        except Exception as e:
+            self._rebuild_requested_at = None
+            print(f"Catalog snapshot rebuild failed: {e}")
+        finally:
+            self._checked_at = None
+    
+    def _build(self, storage):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(f"{self.path}.patches", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            for attempt in range(REBUILD_ATTEMPTS):
+                if attempt == REBUILD_ATTEMPTS - 1:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                patches = read_patch_count(fd)
+                write_snapshot_file(temp_path, load_catalog(storage), time.time())
+                
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if read_patch_count(fd) == patches:
+                        os.replace(temp_path, self.path)
+                        return
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.remove(temp_path)
+        finally:
+            os.close(fd)
+    
+    def _patch(self, storage, apply):
+        """Apply a change to the file currently at the path and count it for rebuilds in progress."""
+        if not catalog_snapshot_enabled():
+            return
+        try:
+            fd = os.open(f"{self.path}.patches", os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            self.view(storage)
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self._reload(storage)
+                view = self._view
+            if view is not None:
+                apply(view)
+                os.pwrite(fd, PATCH_COUNT.pack(read_patch_count(fd) + 1), 0)
+        finally:
+            os.close(fd)
+    
+    def update_stats(self, storage, business_id, rating, review_count):
+        self._patch(storage, lambda view: view.update_stats(business_id, rating, review_count))
+    
+    def remove_business(self, storage, business_id):
+        self._patch(storage, lambda view: view.remove(business_id))
+    
+    def refresh(self, storage):
+        if catalog_snapshot_enabled():
+            self.schedule_rebuild(storage)
+
+catalog_snapshot = CatalogSnapshot(Config.CATALOG_SNAPSHOT_PATH)
+
+def get_catalog_snapshot(storage):
+    if not catalog_snapshot_enabled():
+        return None
+    return catalog_snapshot.view(storage)
@@ -0,0 +1,37 @@
+import os
+import threading
+from pymongo import MongoClient
+from config import Config
+from utils.profiling import profiling_enabled, command_listener
+
+_mongo_uri = Config.MONGO_URI
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+def init_db(app):
+    global _mongo_uri
+    _mongo_uri = app.config['MONGO_URI']
+    reset_client()
+
+def get_client():
+    """Return this process's MongoClient, creating a fresh one after a fork."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                listeners = [command_listener] if profiling_enabled() else []
+                _client = MongoClient(_mongo_uri, maxPoolSize=Config.MONGO_MAX_POOL_SIZE, connect=False, event_listeners=listeners)
+                _client_pid = os.getpid()
+    return _client
+
+def get_db():
+    return get_client().get_database()
+
+def reset_client():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
@@ -1,9 +1,8 @@
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from pymongo import MongoClient
 from bson import ObjectId
-from config import Config
+from utils.storage import get_storage
 
 def admin_required():
     def wrapper(fn):
@@ -12,9 +11,7 @@ def admin_required():
             verify_jwt_in_request()
             current_user_id = get_jwt_identity()
             
-            client = MongoClient(Config.MONGO_URI)
-            db = client.get_database()
-            user = db.users.find_one({"_id": ObjectId(current_user_id)})
+            user = get_storage().users.get(ObjectId(current_user_id))
             
             if not user or user.get('role') != 'admin':
                 return jsonify({"error": "Admin access required"}), 403
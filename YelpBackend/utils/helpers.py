@@ -7,6 +7,14 @@ def validate_object_id(id_string):
     except:
         return None
 
+def parse_id_list(ids_param, max_ids):
+    id_strings = [id_string.strip() for id_string in (ids_param or '').split(',') if id_string.strip()]
+    if not id_strings:
+        raise ValueError("ids is required")
+    if len(id_strings) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+    return id_strings
+
 def serialize_doc(doc):
     if doc is None:
         return None
@@ -16,6 +24,8 @@ def serialize_doc(doc):
         doc['userId'] = str(doc['userId'])
     if 'businessId' in doc:
         doc['businessId'] = str(doc['businessId'])
+    if 'latestReviews' in doc:
+        doc['latestReviews'] = serialize_docs(doc['latestReviews'])
     return doc
 
 def serialize_docs(docs):
@@ -26,3 +36,24 @@ def error_response(message, status_code=400):
 
 def success_response(data, status_code=200):
     return jsonify(data), status_code
+
+def parse_fields(fields_param, allowed_fields):
+    if not fields_param:
+        return None
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    invalid = [field for field in fields if field not in allowed_fields]
+    if invalid:
+        raise ValueError(f"Unknown fields: {', '.join(invalid)}")
+    return fields
+
+def build_projection(fields):
+    if fields is None:
+        return None
+    projection = {field: 1 for field in fields}
+    projection['_id'] = 1
+    return projection
+
+def pick_fields(doc, fields):
+    if doc is None or fields is None:
+        return doc
+    return {key: value for key, value in doc.items() if key == '_id' or key in fields}
@@ -0,0 +1,417 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from bson import ObjectId
+from utils.storage import DuplicateError
+
+# In-process storage with the semantics the API relies on from MongoDB: unique
+# users and one review per user and business, _id-ordered listings, newest-first
+# review pages, rating aggregation and the embedded review summary. Documents are
+# copied on the way in and out, so callers can mutate what they get back. Lookups
+# go through secondary indexes kept next to the documents; per-business rating
+# sums and star counts are kept incrementally, so aggregation is O(1).
+
+def clone(value):
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+def project(doc, projection):
+    if doc is None:
+        return None
+    if not projection:
+        return clone(doc)
+    if any(value for key, value in projection.items() if key != '_id'):
+        keys = {key for key, value in projection.items() if value}
+        if projection.get('_id', 1):
+            keys.add('_id')
+        return {key: clone(value) for key, value in doc.items() if key in keys}
+    return {key: clone(value) for key, value in doc.items() if projection.get(key, 1)}
+
+def newest_first(keys, skip, limit):
+    end = max(len(keys) - max(skip, 0), 0)
+    return keys[max(end - limit, 0):end][::-1]
+
+class MemoryRepository:
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = storage.lock
+        self._docs = {}
+        self._ids = []
+    
+    def ensure_indexes(self):
+        pass
+    
+    def get(self, doc_id, projection=None):
+        with self._lock:
+            return project(self._docs.get(doc_id), projection)
+    
+    def get_many(self, doc_ids, projection=None):
+        with self._lock:
+            return [project(self._docs[doc_id], projection) for doc_id in dict.fromkeys(doc_ids) if doc_id in self._docs]
+    
+    def all(self, projection=None):
+        with self._lock:
+            return [project(self._docs[doc_id], projection) for doc_id in self._ids]
+    
+    def create(self, doc):
+        with self._lock:
+            doc.setdefault('_id', ObjectId())
+            if doc['_id'] in self._docs:
+                raise DuplicateError(f"Duplicate _id {doc['_id']}")
+            stored = clone(doc)
+            self._check_unique(stored)
+            self._docs[stored['_id']] = stored
+            insort(self._ids, stored['_id'])
+            self._index(stored)
+        return doc['_id']
+    
+    def update(self, doc_id, fields):
+        with self._lock:
+            current = self._docs.get(doc_id)
+            if current is None:
+                return
+            updated = dict(current, **clone(fields))
+            self._unindex(current)
+            try:
+                self._check_unique(updated, doc_id)
+            except DuplicateError:
+                self._index(current)
+                raise
+            self._docs[doc_id] = updated
+            self._index(updated)
+    
+    def delete(self, doc_id):
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return
+            del self._ids[bisect_left(self._ids, doc_id)]
+            self._unindex(doc)
+    
+    def delete_all(self):
+        with self._lock:
+            for doc_id in reversed(list(self._ids)):
+                self.delete(doc_id)
+    
+    def _check_unique(self, doc, doc_id=None):
+        pass
+    
+    def _index(self, doc):
+        pass
+    
+    def _unindex(self, doc):
+        pass
+
+class MemoryUserRepository(MemoryRepository):
+    UNIQUE_FIELDS = ['email', 'username']
+    
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._unique = {field: {} for field in self.UNIQUE_FIELDS}
+    
+    def find_by_email(self, email):
+        return self._find_unique('email', email)
+    
+    def find_by_username(self, username):
+        return self._find_unique('username', username)
+    
+    def usernames(self, user_ids):
+        with self._lock:
+            return {user_id: self._docs[user_id]['username'] for user_id in user_ids if user_id in self._docs}
+    
+    def _find_unique(self, field, value):
+        with self._lock:
+            doc_id = self._unique[field].get(value)
+            return clone(self._docs[doc_id]) if doc_id is not None else None
+    
+    def _check_unique(self, doc, doc_id=None):
+        for field in self.UNIQUE_FIELDS:
+            owner = self._unique[field].get(doc.get(field))
+            if owner is not None and owner != doc_id:
+                raise DuplicateError(f"Duplicate {field} {doc.get(field)}")
+    
+    def _index(self, doc):
+        for field in self.UNIQUE_FIELDS:
+            if field in doc:
+                self._unique[field][doc[field]] = doc['_id']
+    
+    def _unindex(self, doc):
+        for field in self.UNIQUE_FIELDS:
+            if self._unique[field].get(doc.get(field)) == doc['_id']:
+                del self._unique[field][doc[field]]
+
+class MemoryBusinessRepository(MemoryRepository):
+    INDEXED_FIELDS = ['city', 'state', 'category']
+    
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._values = {field: defaultdict(set) for field in self.INDEXED_FIELDS}
+    
+    def search(self, filters, min_rating, skip, limit, projection=None):
+        """Return (total, page) of businesses whose fields contain each filter value (case-insensitive)."""
+        with self._lock:
+            matchers = {field: re.compile(value, re.IGNORECASE) for field, value in filters.items()}
+            candidates = None
+            for field in self.INDEXED_FIELDS:
+                if field not in matchers:
+                    continue
+                ids = set()
+                for value, value_ids in self._values[field].items():
+                    if matchers[field].search(value):
+                        ids |= value_ids
+                candidates = ids if candidates is None else candidates & ids
+            
+            rows = self._ids if candidates is None else sorted(candidates)
+            name = matchers.get('name')
+            matched = [
+                doc_id for doc_id in rows
+                if (min_rating is None or (self._docs[doc_id].get('rating') or 0) >= min_rating)
+                and (name is None or name.search(str(self._docs[doc_id].get('name', ''))))
+            ]
+            return len(matched), [project(self._docs[doc_id], projection) for doc_id in matched[max(skip, 0):max(skip, 0) + limit]]
+    
+    def set_rating(self, business_id, rating, review_count):
+        self.update(business_id, {"rating": rating, "reviewCount": review_count})
+    
+    def get_details(self, business_id, projection, review_limit=0, review_projection=None, with_usernames=False, with_histogram=False):
+        with self._lock:
+            business = self.get(business_id, projection)
+            if business is None:
+                return None
+            reviews = self.storage.reviews
+            if review_limit:
+                business['reviews'] = reviews.list_for_business(business_id, 0, review_limit, review_projection)
+                if with_usernames:
+                    usernames = self.storage.users.usernames({review['userId'] for review in business['reviews'] if 'userId' in review})
+                    for review in business['reviews']:
+                        if review.get('userId') in usernames:
+                            review['username'] = usernames[review['userId']]
+            if with_histogram:
+                business['ratingHistogram'] = reviews.rating_histogram(business_id)
+            return business
+    
+    def push_latest_review(self, business_id, entry, limit, histogram):
+        with self._lock:
+            business = self._docs.get(business_id)
+            if business is None or 'ratingHistogram' not in business:
+                return False
+            latest = business.get('latestReviews', []) + [clone(entry)]
+            latest.sort(key=lambda review: review['createdAt'], reverse=True)
+            business['latestReviews'] = latest[:limit]
+            self._inc_histogram(business, histogram)
+            return True
+    
+    def update_latest_review(self, business_id, review_id, changes, histogram):
+        with self._lock:
+            business = self._docs.get(business_id)
+            if business is None or 'ratingHistogram' not in business:
+                return False
+            for entry in business.get('latestReviews', []):
+                if entry['_id'] == review_id:
+                    entry.update(clone(changes))
+            self._inc_histogram(business, histogram)
+            return True
+    
+    def pull_latest_review(self, business_id, review_id, histogram):
+        with self._lock:
+            business = self._docs.get(business_id)
+            if business is None or 'ratingHistogram' not in business:
+                return None
+            latest = business.get('latestReviews', [])
+            business['latestReviews'] = [entry for entry in latest if entry['_id'] != review_id]
+            self._inc_histogram(business, histogram)
+            return len(business['latestReviews']) != len(latest)
+    
+    def set_review_summary(self, business_id, latest_reviews, histogram=None):
+        fields = {"latestReviews": latest_reviews}
+        if histogram is not None:
+            fields['ratingHistogram'] = histogram
+        self.update(business_id, fields)
+    
+    def _inc_histogram(self, business, histogram):
+        if not histogram:
+            return
+        counts = business.setdefault('ratingHistogram', {})
+        for star, delta in histogram.items():
+            counts[star] = counts.get(star, 0) + delta
+    
+    def _index(self, doc):
+        for field in self.INDEXED_FIELDS:
+            if field in doc:
+                self._values[field][str(doc[field])].add(doc['_id'])
+    
+    def _unindex(self, doc):
+        for field in self.INDEXED_FIELDS:
+            if field in doc:
+                ids = self._values[field][str(doc[field])]
+                ids.discard(doc['_id'])
+                if not ids:
+                    del self._values[field][str(doc[field])]
+
+class MemoryReviewRepository(MemoryRepository):
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._by_business = defaultdict(list)
+        self._by_user = defaultdict(list)
+        self._by_author = {}
+        self._stats = defaultdict(lambda: {"count": 0, "ratingSum": 0, "histogram": defaultdict(int)})
+    
+    def get(self, doc_id, projection=None, business_id=None):
+        if not self._in_business(doc_id, business_id):
+            return None
+        return super().get(doc_id, projection)
+    
+    def update(self, doc_id, fields, business_id=None):
+        if self._in_business(doc_id, business_id):
+            super().update(doc_id, fields)
+    
+    def delete(self, doc_id, business_id=None):
+        if self._in_business(doc_id, business_id):
+            super().delete(doc_id)
+    
+    def _in_business(self, doc_id, business_id):
+        doc = self._docs.get(doc_id)
+        return doc is not None and (business_id is None or doc['businessId'] == business_id)
+    
+    def find_by_user(self, business_id, user_id):
+        with self._lock:
+            review_id = self._by_author.get((business_id, user_id))
+            return clone(self._docs[review_id]) if review_id is not None else None
+    
+    def count_for_business(self, business_id):
+        with self._lock:
+            return len(self._by_business.get(business_id, []))
+    
+    def list_for_business(self, business_id, skip, limit, projection=None):
+        with self._lock:
+            keys = newest_first(self._by_business.get(business_id, []), skip, limit)
+            return [project(self._docs[review_id], projection) for _, review_id in keys]
+    
+    def list_for_user(self, user_id, before, limit, projection=None):
+        with self._lock:
+            keys = self._by_user.get(user_id, [])
+            end = bisect_left(keys, before) if before is not None else len(keys)
+            return [project(self._docs[review_id], projection) for _, review_id in keys[max(end - limit, 0):end][::-1]]
+    
+    def set_business_info(self, business_id, fields):
+        with self._lock:
+            for _, review_id in self._by_business.get(business_id, []):
+                self._docs[review_id].update(clone(fields))
+    
+    def rating_stats(self, business_id):
+        with self._lock:
+            stats = self._stats.get(business_id)
+            if not stats or not stats['count']:
+                return None, 0
+            return stats['ratingSum'] / stats['count'], stats['count']
+    
+    def rating_histogram(self, business_id):
+        with self._lock:
+            stats = self._stats.get(business_id)
+            return {star: count for star, count in stats['histogram'].items() if count} if stats else {}
+    
+    def delete_for_business(self, business_id):
+        with self._lock:
+            for _, review_id in list(self._by_business.get(business_id, [])):
+                self.delete(review_id)
+    
+    def _check_unique(self, doc, doc_id=None):
+        owner = self._by_author.get((doc.get('businessId'), doc.get('userId')))
+        if owner is not None and owner != doc_id:
+            raise DuplicateError("Duplicate review for business and user")
+    
+    def _index(self, doc):
+        business_id = doc.get('businessId')
+        insort(self._by_business[business_id], (doc['createdAt'], doc['_id']))
+        insort(self._by_user[doc.get('userId')], (doc['createdAt'], doc['_id']))
+        self._by_author[(business_id, doc.get('userId'))] = doc['_id']
+        stats = self._stats[business_id]
+        stats['count'] += 1
+        stats['ratingSum'] += doc['rating']
+        stats['histogram'][str(doc['rating'])] += 1
+    
+    def _unindex(self, doc):
+        business_id = doc.get('businessId')
+        keys = self._by_business[business_id]
+        del keys[bisect_left(keys, (doc['createdAt'], doc['_id']))]
+        if not keys:
+            del self._by_business[business_id]
+        keys = self._by_user[doc.get('userId')]
+        del keys[bisect_left(keys, (doc['createdAt'], doc['_id']))]
+        if not keys:
+            del self._by_user[doc.get('userId')]
+        self._by_author.pop((business_id, doc.get('userId')), None)
+        stats = self._stats[business_id]
+        stats['count'] -= 1
+        stats['ratingSum'] -= doc['rating']
+        stats['histogram'][str(doc['rating'])] -= 1
+        if not stats['count']:
+            del self._stats[business_id]
+
+class MemoryRollupRepository:
+    def __init__(self, storage):
+        self._lock = storage.lock
+        self._rollups = {}
+        self._starts = defaultdict(list)
+    
+    def ensure_indexes(self):
+        pass
+    
+    def increment(self, updates):
+        with self._lock:
+            for update in updates:
+                key = (update['scope'], update['key'], update['granularity'])
+                rollup = self._rollups.get(key + (update['start'],))
+                if rollup is None:
+                    rollup = {"scope": update['scope'], "key": update['key'], "granularity": update['granularity'], "start": update['start'], "count": 0, "ratingSum": 0, "histogram": {}}
+                    self._rollups[key + (update['start'],)] = rollup
+                    insort(self._starts[key], update['start'])
+                rollup['count'] += update['count']
+                rollup['ratingSum'] += update['ratingSum']
+                for star, delta in update['histogram'].items():
+                    if delta:
+                        rollup['histogram'][star] = rollup['histogram'].get(star, 0) + delta
+    
+    def for_key(self, scope, key):
+        with self._lock:
+            return [clone(rollup) for rollup in self._rollups.values() if rollup['scope'] == scope and rollup['key'] == key]
+    
+    def in_range(self, scope, key, granularity, first, last):
+        with self._lock:
+            starts = self._starts.get((scope, key, granularity), [])
+            return [
+                clone(self._rollups[(scope, key, granularity, start)])
+                for start in starts[bisect_left(starts, first):bisect_right(starts, last)]
+            ]
+    
+    def delete_key(self, scope, key):
+        with self._lock:
+            for granularity in [granularity for (rollup_scope, rollup_key, granularity) in self._starts if rollup_scope == scope and rollup_key == key]:
+                for start in self._starts.pop((scope, key, granularity)):
+                    del self._rollups[(scope, key, granularity, start)]
+    
+    def replace_all(self, rollups, batch_size=None):
+        with self._lock:
+            self._rollups = {}
+            self._starts = defaultdict(list)
+            for rollup in rollups:
+                key = (rollup['scope'], rollup['key'], rollup['granularity'])
+                self._rollups[key + (rollup['start'],)] = clone(rollup)
+                insort(self._starts[key], rollup['start'])
+
+class MemoryStorage:
+    name = 'memory'
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = MemoryUserRepository(self)
+        self.businesses = MemoryBusinessRepository(self)
+        self.reviews = MemoryReviewRepository(self)
+        self.rollups = MemoryRollupRepository(self)
+    
+    def ensure_indexes(self):
+        pass
@@ -0,0 +1,329 @@
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from utils.db import get_db
+from utils.review_buckets import BUCKET_SHARD_KEY
+from utils.storage import DuplicateError
+
+class MongoRepository:
+    collection_name = None
+    shard_key = None
+    
+    def __init__(self, storage):
+        self.storage = storage
+    
+    @property
+    def collection(self):
+        return self.storage.db[self.collection_name]
+    
+    def get(self, doc_id, projection=None):
+        return self.collection.find_one({"_id": doc_id}, projection)
+    
+    def get_many(self, doc_ids, projection=None):
+        return list(self.collection.find({"_id": {"$in": list(doc_ids)}}, projection))
+    
+    def all(self, projection=None):
+        return self.collection.find({}, projection).sort("_id", ASCENDING)
+    
+    def create(self, doc):
+        try:
+            doc['_id'] = self.collection.insert_one(doc).inserted_id
+        except DuplicateKeyError as e:
+            raise DuplicateError(str(e))
+        return doc['_id']
+    
+    def update(self, doc_id, fields):
+        self.collection.update_one({"_id": doc_id}, {"$set": fields})
+    
+    def delete(self, doc_id):
+        self.collection.delete_one({"_id": doc_id})
+    
+    def delete_all(self):
+        self.collection.delete_many({})
+
+class MongoUserRepository(MongoRepository):
+    collection_name = 'users'
+    # Left unsharded: small, and email and username must both stay unique.
+    
+    def ensure_indexes(self):
+        self.collection.create_index("email", unique=True)
+        self.collection.create_index("username", unique=True)
+    
+    def find_by_email(self, email):
+        return self.collection.find_one({"email": email})
+    
+    def find_by_username(self, username):
+        return self.collection.find_one({"username": username})
+    
+    def usernames(self, user_ids):
+        users = self.collection.find({"_id": {"$in": list(user_ids)}}, {"username": 1})
+        return {user['_id']: user['username'] for user in users}
+
+class MongoBusinessRepository(MongoRepository):
+    collection_name = 'businesses'
+    shard_key = {"_id": "hashed"}
+    
+    def ensure_indexes(self):
+        pass
+    
+    def search(self, filters, min_rating, skip, limit, projection=None):
+        """Return (total, page) of businesses whose fields contain each filter value (case-insensitive)."""
+        query = {field: {"$regex": value, "$options": "i"} for field, value in filters.items()}
+        if min_rating is not None:
+            query['rating'] = {"$gte": min_rating}
+        
+        total = self.collection.count_documents(query) if query else self.collection.estimated_document_count()
+        return total, list(self.collection.find(query, projection).skip(skip).limit(limit))
+    
+    def set_rating(self, business_id, rating, review_count):
+        self.collection.update_one(
+            {"_id": business_id},
+            {"$set": {"rating": rating, "reviewCount": review_count}}
+        )
+    
+    def get_details(self, business_id, projection, review_limit=0, review_projection=None, with_usernames=False, with_histogram=False):
+        """Return the business with its newest reviews and/or a fresh star histogram in one round trip."""
+        pipeline = [{"$match": {"_id": business_id}}]
+        if projection is not None:
+            pipeline.append({"$project": projection})
+        
+        if review_limit:
+            review_pipeline = [
+                {"$sort": {"createdAt": -1}},
+                {"$limit": review_limit}
+            ]
+            if review_projection is not None:
+                review_pipeline.append({"$project": review_projection})
+            if with_usernames:
+                review_pipeline.extend([
+                    {"$lookup": {
+                        "from": "users",
+                        "localField": "userId",
+                        "foreignField": "_id",
+                        "pipeline": [{"$project": {"username": 1}}],
+                        "as": "user"
+                    }},
+                    {"$set": {"username": {"$first": "$user.username"}}},
+                    {"$unset": "user"}
+                ])
+            pipeline.append({"$lookup": {
+                "from": "reviews",
+                "localField": "_id",
+                "foreignField": "businessId",
+                "pipeline": review_pipeline,
+                "as": "reviews"
+            }})
+        
+        if with_histogram:
+            pipeline.append({"$lookup": {
+                "from": "reviews",
+                "localField": "_id",
+                "foreignField": "businessId",
+                "pipeline": [{"$group": {"_id": "$rating", "count": {"$sum": 1}}}],
+                "as": "ratingDistribution"
+            }})
+        
+        result = list(self.collection.aggregate(pipeline))
+        if not result:
+            return None
+        
+        business = result[0]
+        if 'ratingDistribution' in business:
+            business['ratingHistogram'] = {str(bucket['_id']): bucket['count'] for bucket in business.pop('ratingDistribution')}
+        return business
+    
+    def push_latest_review(self, business_id, entry, limit, histogram):
+        """Add a review to the summary; return False if the business has no summary to update."""
+        result = self.collection.update_one(
+            {"_id": business_id, "ratingHistogram": {"$exists": True}},
+            {
+                "$push": {"latestReviews": {
+                    "$each": [entry],
+                    "$sort": {"createdAt": -1},
+                    "$slice": limit
+                }},
+                "$inc": {f"ratingHistogram.{star}": delta for star, delta in histogram.items()}
+            }
+        )
+        return result.matched_count > 0
+    
+    def update_latest_review(self, business_id, review_id, changes, histogram):
+        update = {}
+        if changes:
+            update['$set'] = {f"latestReviews.$[entry].{field}": value for field, value in changes.items()}
+        if histogram:
+            update['$inc'] = {f"ratingHistogram.{star}": delta for star, delta in histogram.items()}
+        
+        if not update:
+            return True
+        result = self.collection.update_one(
+            {"_id": business_id, "ratingHistogram": {"$exists": True}},
+            update,
+            array_filters=[{"entry._id": review_id}] if changes else None
+        )
+        return result.matched_count > 0
+    
+    def pull_latest_review(self, business_id, review_id, histogram):
+        """Remove a review from the summary; return True if it was one of the latest reviews
+        and None if the business has no summary to update."""
+        business = self.collection.find_one_and_update(
+            {"_id": business_id, "ratingHistogram": {"$exists": True}},
+            {
+                "$pull": {"latestReviews": {"_id": review_id}},
+                "$inc": {f"ratingHistogram.{star}": delta for star, delta in histogram.items()}
+            },
+            projection={"latestReviews._id": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if business is None:
+            return None
+        return any(entry['_id'] == review_id for entry in business.get('latestReviews', []))
+    
+    def set_review_summary(self, business_id, latest_reviews, histogram=None):
+        fields = {"latestReviews": latest_reviews}
+        if histogram is not None:
+            fields['ratingHistogram'] = histogram
+        self.collection.update_one({"_id": business_id}, {"$set": fields})
+
+class MongoReviewRepository(MongoRepository):
+    collection_name = 'reviews'
+    shard_key = {"businessId": 1, "userId": 1}
+    
+    def ensure_indexes(self):
+        self.collection.create_index([("businessId", ASCENDING), ("createdAt", DESCENDING)])
+        self.collection.create_index([("businessId", ASCENDING), ("userId", ASCENDING)], unique=True)
+        self.collection.create_index([("userId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)])
+    
+    def target(self, review_id, business_id):
+        """Filter on a review id, narrowed to its business's shard when the business is known."""
+        query = {"_id": review_id}
+        if business_id is not None:
+            query['businessId'] = business_id
+        return query
+    
+    def get(self, review_id, projection=None, business_id=None):
+        return self.collection.find_one(self.target(review_id, business_id), projection)
+    
+    def update(self, review_id, fields, business_id=None):
+        self.collection.update_one(self.target(review_id, business_id), {"$set": fields})
+    
+    def delete(self, review_id, business_id=None):
+        self.collection.delete_one(self.target(review_id, business_id))
+    
+    def find_by_user(self, business_id, user_id):
+        return self.collection.find_one({"businessId": business_id, "userId": user_id})
+    
+    def count_for_business(self, business_id):
+        return self.collection.count_documents({"businessId": business_id})
+    
+    def list_for_business(self, business_id, skip, limit, projection=None):
+        return list(self.collection.find({"businessId": business_id}, projection).sort("createdAt", DESCENDING).skip(skip).limit(limit))
+    
+    def list_for_user(self, user_id, before, limit, projection=None):
+        """Return up to limit of a user's reviews, newest first, older than the (createdAt, _id) key before."""
+        query = {"userId": user_id}
+        if before is not None:
+            created_at, review_id = before
+            query['$or'] = [
+                {"createdAt": {"$lt": created_at}},
+                {"createdAt": created_at, "_id": {"$lt": review_id}}
+            ]
+        return list(self.collection.find(query, projection).sort([("createdAt", DESCENDING), ("_id", DESCENDING)]).limit(limit))
+    
+    def set_business_info(self, business_id, fields):
+        self.collection.update_many({"businessId": business_id}, {"$set": fields})
+    
+    def rating_stats(self, business_id):
+        """Return (average rating, review count) for a business."""
+        result = list(self.collection.aggregate([
+            {"$match": {"businessId": business_id}},
+            {"$group": {
+                "_id": "$businessId",
+                "averageRating": {"$avg": "$rating"},
+                "count": {"$sum": 1}
+            }}
+        ]))
+        if not result:
+            return None, 0
+        return result[0]['averageRating'], result[0]['count']
+    
+    def rating_histogram(self, business_id):
+        return {
+            str(bucket['_id']): bucket['count']
+            for bucket in self.collection.aggregate([
+                {"$match": {"businessId": business_id}},
+                {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+            ])
+        }
+    
+    def delete_for_business(self, business_id):
+        self.collection.delete_many({"businessId": business_id})
+
+class MongoRollupRepository(MongoRepository):
+    collection_name = 'review_rollups'
+    shard_key = {"scope": 1, "key": 1, "granularity": 1, "start": 1}
+    
+    def ensure_indexes(self):
+        self.collection.create_index([("scope", ASCENDING), ("key", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING)], unique=True)
+    
+    def increment(self, updates):
+        """Apply rollup deltas: each update names scope, key, granularity and start and carries count, ratingSum and histogram deltas."""
+        operations = []
+        for update in updates:
+            inc = {"count": update['count'], "ratingSum": update['ratingSum']}
+            inc.update({f"histogram.{star}": delta for star, delta in update['histogram'].items() if delta})
+            operations.append(UpdateOne(
+                {"scope": update['scope'], "key": update['key'], "granularity": update['granularity'], "start": update['start']},
+                {"$inc": inc},
+                upsert=True
+            ))
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+    
+    def for_key(self, scope, key):
+        return self.collection.find({"scope": scope, "key": key})
+    
+    def in_range(self, scope, key, granularity, first, last):
+        return self.collection.find(
+            {"scope": scope, "key": key, "granularity": granularity, "start": {"$gte": first, "$lte": last}},
+            {"_id": 0, "start": 1, "count": 1, "ratingSum": 1, "histogram": 1}
+        ).sort("start", ASCENDING)
+    
+    def delete_key(self, scope, key):
+        self.collection.delete_many({"scope": scope, "key": key})
+    
+    def replace_all(self, rollups, batch_size=1000):
+        self.collection.delete_many({})
+        batch = []
+        for rollup in rollups:
+            batch.append(rollup)
+            if len(batch) == batch_size:
+                self.collection.insert_many(batch)
+                batch = []
+        if batch:
+            self.collection.insert_many(batch)
+
+class MongoStorage:
+    name = 'mongo'
+    
+    def __init__(self):
+        self.users = MongoUserRepository(self)
+        self.businesses = MongoBusinessRepository(self)
+        self.reviews = MongoReviewRepository(self)
+        self.rollups = MongoRollupRepository(self)
+    
+    @property
+    def db(self):
+        return get_db()
+    
+    def repositories(self):
+        return [self.users, self.businesses, self.reviews, self.rollups]
+    
+    def ensure_indexes(self):
+        for repository in self.repositories():
+            repository.ensure_indexes()
+    
+    def shard_keys(self):
+        """Return the shard key of every collection that is sharded on a cluster."""
+        keys = {repository.collection_name: repository.shard_key for repository in self.repositories() if repository.shard_key}
+        keys['review_buckets'] = BUCKET_SHARD_KEY
+        return keys
@@ -0,0 +1,284 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from pymongo import monitoring
+from config import Config
+
+# Profiling is opt-in per process (PROFILING_ENABLED). When it is off none of the
+# request hooks or the Mongo command listener are installed, so requests pay
+# nothing. When it is on, a request is profiled if it wins the
+# PROFILE_SAMPLE_RATE draw or carries a valid X-Profile-Token header.
+#
+# Finished profiles are written to PROFILE_DIR rather than kept in the worker
+# that recorded them, so the admin endpoints can serve any profile from any
+# worker sharing that directory. Ids are random tokens, so workers never hand
+# out the same id. Each profile is a JSON file (summary, Mongo commands and
+# folded stacks) next to a marshalled pstats file, and only the newest
+# PROFILE_BUFFER_SIZE profiles are kept.
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_ID = re.compile(r'^[0-9a-f]{16}$')
+
+_profiler_lock = threading.Lock()
+_current = threading.local()
+
+def profiling_enabled():
+    return Config.PROFILING_ENABLED
+
+def sign_profile_token(method, path, expires_at):
+    message = f"{expires_at}:{method.upper()}:{path}".encode()
+    signature = hmac.new(Config.PROFILE_SECRET.encode(), message, hashlib.sha256).hexdigest()
+    return f"{expires_at}:{signature}"
+
+def verify_profile_token(token, method, path):
+    try:
+        expires_at = int(token.split(':', 1)[0])
+    except ValueError:
+        return False
+    if expires_at < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(method, path, expires_at))
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records the Mongo commands issued by the request being profiled on this thread."""
+    
+    def started(self, event):
+        profile = getattr(_current, 'profile', None)
+        if profile is not None:
+            collection = event.command.get(event.command_name)
+            profile.pending[event.request_id] = {
+                "command": event.command_name,
+                "collection": collection if isinstance(collection, str) else None
+            }
+    
+    def succeeded(self, event):
+        self._finish(event, True)
+    
+    def failed(self, event):
+        self._finish(event, False)
+    
+    def _finish(self, event, ok):
+        profile = getattr(_current, 'profile', None)
+        if profile is None:
+            return
+        command = profile.pending.pop(event.request_id, None)
+        if command is not None:
+            command['duration_ms'] = round(event.duration_micros / 1000, 3)
+            command['ok'] = ok
+            profile.mongo_commands.append(command)
+
+command_listener = MongoCommandListener()
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval into folded stacks."""
+    
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class RequestProfile:
+    def __init__(self, method, path, reason):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.duration_ms = None
+        self.status = None
+        self.pending = {}
+        self.mongo_commands = []
+        self.stats = None
+        self.stacks = None
+    
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "startedAt": self.started_at.isoformat(),
+            "durationMs": self.duration_ms,
+            "status": self.status,
+            "mongoCommands": len(self.mongo_commands),
+            "mongoMs": round(sum(command['duration_ms'] for command in self.mongo_commands), 3),
+            "samples": sum(self.stacks.values()) if self.stacks else 0
+        }
+    
+    def top_functions(self, limit=25):
+        output = io.StringIO()
+        stats = pstats.Stats(stream=output)
+        stats.add(self.stats)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+    
+    def pstats_dump(self):
+        return marshal.dumps(self.stats.stats)
+    
+    def folded_stacks(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class SavedProfile(RequestProfile):
+    """A finished profile read back from PROFILE_DIR."""
+    
+    def __init__(self, record, stats):
+        self.id = record['summary']['id']
+        self.record = record
+        self.mongo_commands = record['mongoCommands']
+        self.stacks = Counter(record['stacks'])
+        self.stats = stats
+    
+    def summary(self):
+        return self.record['summary']
+
+def should_profile():
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return 'token' if verify_profile_token(token, request.method, request.path) else None
+    if Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+def start_profile():
+    reason = should_profile()
+    if reason is None or not _profiler_lock.acquire(blocking=False):
+        return
+    
+    profile = RequestProfile(request.method, request.path, reason)
+    profile.profiler = cProfile.Profile()
+    profile.sampler = StackSampler(threading.get_ident(), Config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    profile.started = time.perf_counter()
+    _current.profile = profile
+    g.request_profile = profile
+    
+    profile.sampler.start()
+    profile.profiler.enable()
+
+def record_status(response):
+    profile = g.get('request_profile')
+    if profile is not None:
+        profile.status = response.status_code
+    return response
+
+def finish_profile(error=None):
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        return
+    
+    try:
+        profile.profiler.disable()
+        profile.sampler.stop()
+        profile.duration_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+        profile.stats = pstats.Stats(profile.profiler)
+        profile.stacks = profile.sampler.stacks
+        del profile.profiler, profile.sampler, profile.pending
+        save_profile(profile)
+    except OSError as e:
+        print(f"Saving profile {profile.id} failed: {e}")
+    finally:
+        _current.profile = None
+        _profiler_lock.release()
+
+def profile_path(profile_id, extension):
+    return os.path.join(Config.PROFILE_DIR, f"{profile_id}.{extension}")
+
+def write_file(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as output:
+        output.write(data)
+    os.replace(temp_path, path)
+
+def save_profile(profile):
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    # The pstats file goes first: a profile is listed once its JSON file exists.
+    write_file(profile_path(profile.id, 'pstats'), profile.pstats_dump())
+    write_file(profile_path(profile.id, 'json'), json.dumps({
+        "summary": profile.summary(),
+        "mongoCommands": profile.mongo_commands,
+        "stacks": dict(profile.stacks)
+    }).encode())
+    for profile_id in saved_profile_ids()[Config.PROFILE_BUFFER_SIZE:]:
+        for extension in ('json', 'pstats'):
+            try:
+                os.remove(profile_path(profile_id, extension))
+            except OSError:
+                pass
+
+def saved_profile_ids():
+    """Ids of the profiles in PROFILE_DIR, newest first."""
+    try:
+        names = os.listdir(Config.PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    saved = []
+    for name in names:
+        profile_id, extension = os.path.splitext(name)
+        if extension == '.json' and PROFILE_ID.match(profile_id):
+            try:
+                saved.append((os.path.getmtime(profile_path(profile_id, 'json')), profile_id))
+            except OSError:
+                pass
+    return [profile_id for _, profile_id in sorted(saved, reverse=True)]
+
+def read_json(path):
+    try:
+        with open(path, 'rb') as record_file:
+            return json.load(record_file)
+    except (OSError, ValueError):
+        # Pruned by another worker since it was listed
+        return None
+
+def recent_profiles():
+    records = (read_json(profile_path(profile_id, 'json')) for profile_id in saved_profile_ids()[:Config.PROFILE_BUFFER_SIZE])
+    return [record['summary'] for record in records if record is not None]
+
+def find_profile(profile_id):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    record = read_json(profile_path(profile_id, 'json'))
+    if record is None:
+        return None
+    try:
+        stats = pstats.Stats(profile_path(profile_id, 'pstats'))
+    except OSError:
+        return None
+    return SavedProfile(record, stats)
+
+def init_profiling(app):
+    if not profiling_enabled():
+        return
+    app.before_request(start_profile)
+    app.after_request(record_status)
+    app.teardown_request(finish_profile)
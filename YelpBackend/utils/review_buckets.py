@@ -0,0 +1,169 @@
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import Config
+
+# Each bucket holds up to REVIEW_BUCKET_SIZE reviews of one business in creation
+# order. `start` orders a business's buckets and is never rewritten: a new bucket
+# starts after the latest one, and a deleted review only shrinks its own bucket,
+# so concurrent writes never renumber buckets under each other. A feed page sums
+# the bucket counts newest-first from a covered index scan to find its one or two
+# buckets, then reads just those. The reviews collection stays the source of
+# truth and the buckets are rebuilt from it by migrate_review_buckets.py.
+
+BUCKET_FIELDS = ['businessName', 'businessCategory', 'userId', 'username', 'rating', 'text', 'createdAt']
+BUCKET_SHARD_KEY = {"businessId": 1}
+
+def buckets_enabled():
+    return Config.REVIEW_STORAGE == 'buckets' and Config.STORAGE_BACKEND == 'mongo'
+
+def ensure_bucket_indexes(db):
+    db.review_buckets.create_index([("businessId", ASCENDING), ("start", DESCENDING)], unique=True)
+    db.review_buckets.create_index([("businessId", ASCENDING), ("start", DESCENDING), ("count", ASCENDING)])
+    db.review_buckets.create_index("reviews._id")
+    db.reviews.create_index([("businessId", ASCENDING), ("createdAt", DESCENDING)])
+
+def bucket_entry(review):
+    entry = {"_id": review['_id']}
+    for field in BUCKET_FIELDS:
+        if field in review:
+            entry[field] = review[field]
+    return entry
+
+def add_review_to_bucket(db, review, attempts=3):
+    business_id = review['businessId']
+    entry = bucket_entry(review)
+    
+    for attempt in range(attempts):
+        try:
+            append_to_latest_bucket(db, business_id, entry, review['createdAt'])
+            return
+        except DuplicateKeyError:
+            if attempt == attempts - 1:
+                raise
+
+def append_to_latest_bucket(db, business_id, entry, created_at):
+    latest = db.review_buckets.find_one(
+        {"businessId": business_id},
+        {"start": 1, "count": 1},
+        sort=[("start", DESCENDING)]
+    )
+    
+    if latest:
+        result = db.review_buckets.update_one(
+            {"_id": latest['_id'], "businessId": business_id, "count": {"$lt": Config.REVIEW_BUCKET_SIZE}},
+            {
+                "$push": {"reviews": entry},
+                "$inc": {"count": 1},
+                "$set": {"lastCreatedAt": created_at}
+            }
+        )
+        if result.modified_count:
+            return
+        start = latest['start'] + latest['count']
+    else:
+        start = 0
+    
+    db.review_buckets.insert_one({
+        "businessId": business_id,
+        "start": start,
+        "count": 1,
+        "firstCreatedAt": created_at,
+        "lastCreatedAt": created_at,
+        "reviews": [entry]
+    })
+
+def update_review_in_bucket(db, business_id, review_id, update_data):
+    changes = {f"reviews.$.{field}": value for field, value in update_data.items() if field in BUCKET_FIELDS}
+    if changes:
+        db.review_buckets.update_one(
+            {"businessId": business_id, "reviews._id": review_id},
+            {"$set": changes}
+        )
+
+def set_bucket_business_info(db, business_id, fields):
+    db.review_buckets.update_many(
+        {"businessId": business_id},
+        {"$set": {f"reviews.$[].{field}": value for field, value in fields.items()}}
+    )
+
+def remove_review_from_bucket(db, business_id, review_id):
+    bucket = db.review_buckets.find_one_and_update(
+        {"businessId": business_id, "reviews._id": review_id},
+        {"$pull": {"reviews": {"_id": review_id}}, "$inc": {"count": -1}},
+        projection={"count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if bucket and bucket['count'] == 0:
+        db.review_buckets.delete_one({"_id": bucket['_id'], "businessId": business_id, "count": 0})
+
+def delete_business_buckets(db, business_id):
+    db.review_buckets.delete_many({"businessId": business_id})
+
+def get_bucket_page(db, business_id, total, skip, limit):
+    """Return one newest-first feed page, or None if the buckets are missing or out of sync."""
+    if skip >= total or limit <= 0:
+        return []
+    
+    # Offset of each bucket's newest review in the feed, from the index alone
+    headers = db.review_buckets.find(
+        {"businessId": business_id},
+        {"_id": 0, "start": 1, "count": 1}
+    ).sort("start", DESCENDING)
+    offsets = {}
+    newer = 0
+    for header in headers:
+        if newer < skip + limit and newer + header['count'] > skip:
+            offsets[header['start']] = newer
+        newer += header['count']
+    if newer != total:
+        return None
+    
+    cursor = db.review_buckets.find(
+        {"businessId": business_id, "start": {"$in": list(offsets)}},
+        {"start": 1, "reviews": 1}
+    ).sort("start", DESCENDING)
+    
+    reviews = []
+    for bucket in cursor:
+        offset = offsets[bucket['start']]
+        entries = bucket['reviews'][::-1][max(skip - offset, 0):skip + limit - offset]
+        for entry in entries:
+            entry['businessId'] = business_id
+            reviews.append(entry)
+    
+    if len(reviews) != min(limit, total - skip):
+        return None
+    return reviews
+
+def insert_bucket(db, business_id, start, reviews):
+    user_ids = list({review['userId'] for review in reviews})
+    usernames = {user['_id']: user['username'] for user in db.users.find({"_id": {"$in": user_ids}}, {"username": 1})}
+    for review in reviews:
+        if review['userId'] in usernames:
+            review['username'] = usernames[review['userId']]
+    
+    db.review_buckets.insert_one({
+        "businessId": business_id,
+        "start": start,
+        "count": len(reviews),
+        "firstCreatedAt": reviews[0]['createdAt'],
+        "lastCreatedAt": reviews[-1]['createdAt'],
+        "reviews": [bucket_entry(review) for review in reviews]
+    })
+
+def rebuild_buckets(db, business_id):
+    delete_business_buckets(db, business_id)
+    
+    total = 0
+    chunk = []
+    for review in db.reviews.find({"businessId": business_id}).sort([("createdAt", ASCENDING), ("_id", ASCENDING)]):
+        chunk.append(review)
+        if len(chunk) == Config.REVIEW_BUCKET_SIZE:
+            insert_bucket(db, business_id, total, chunk)
+            total += len(chunk)
+            chunk = []
+    
+    if chunk:
+        insert_bucket(db, business_id, total, chunk)
+        total += len(chunk)
+    return total
@@ -0,0 +1,155 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from utils.review_summary import empty_histogram
+
+# Review activity is rolled up into one document per business and per category
+# for every day and every week (weeks start on Monday, UTC) that has reviews:
+# review count, rating sum and star histogram. Review writes $inc the matching
+# buckets, so a trend over any range reads one small document per period no
+# matter how many reviews sit underneath. rebuild_review_rollups.py backfills
+# them from the reviews collection.
+
+GRANULARITIES = ['day', 'week']
+
+def ensure_rollup_indexes(storage):
+    storage.rollups.ensure_indexes()
+
+def period_start(created_at, granularity):
+    day = datetime(created_at.year, created_at.month, created_at.day)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+def next_period(start, granularity):
+    return start + timedelta(days=7 if granularity == 'week' else 1)
+
+def rollup_targets(business_id, category):
+    targets = [('business', business_id)]
+    if category:
+        targets.append(('category', category))
+    return targets
+
+def rollup_updates(targets, start_dates, count, rating_sum, histogram):
+    return [
+        {
+            "scope": scope,
+            "key": key,
+            "granularity": granularity,
+            "start": start_dates[granularity],
+            "count": count,
+            "ratingSum": rating_sum,
+            "histogram": histogram
+        }
+        for scope, key in targets
+        for granularity in GRANULARITIES
+    ]
+
+def review_start_dates(review):
+    return {granularity: period_start(review['createdAt'], granularity) for granularity in GRANULARITIES}
+
+def business_category(storage, business_id):
+    business = storage.businesses.get(business_id, {"category": 1})
+    return business.get('category') if business else None
+
+def add_review_to_rollups(storage, review, category):
+    storage.rollups.increment(rollup_updates(
+        rollup_targets(review['businessId'], category),
+        review_start_dates(review),
+        1, review['rating'], {str(review['rating']): 1}
+    ))
+
+def update_review_in_rollups(storage, review, update_data, category):
+    rating = update_data.get('rating', review['rating'])
+    if rating == review['rating']:
+        return
+    storage.rollups.increment(rollup_updates(
+        rollup_targets(review['businessId'], category),
+        review_start_dates(review),
+        0, rating - review['rating'], {str(review['rating']): -1, str(rating): 1}
+    ))
+
+def remove_review_from_rollups(storage, review, category):
+    storage.rollups.increment(rollup_updates(
+        rollup_targets(review['businessId'], category),
+        review_start_dates(review),
+        -1, -review['rating'], {str(review['rating']): -1}
+    ))
+
+def move_business_rollups(storage, business_id, old_category, new_category):
+    """Move a business's contribution from one category's rollups to another's."""
+    updates = []
+    for rollup in storage.rollups.for_key("business", business_id):
+        for category, sign in [(old_category, -1), (new_category, 1)]:
+            if not category:
+                continue
+            updates.append({
+                "scope": "category",
+                "key": category,
+                "granularity": rollup['granularity'],
+                "start": rollup['start'],
+                "count": sign * rollup['count'],
+                "ratingSum": sign * rollup['ratingSum'],
+                "histogram": {star: sign * count for star, count in rollup.get('histogram', {}).items()}
+            })
+    storage.rollups.increment(updates)
+
+def delete_business_rollups(storage, business_id, category):
+    move_business_rollups(storage, business_id, category, None)
+    storage.rollups.delete_key("business", business_id)
+
+def rebuild_review_rollups(storage):
+    categories = {business['_id']: business.get('category') for business in storage.businesses.all({"category": 1})}
+    rollups = defaultdict(lambda: {"count": 0, "ratingSum": 0, "histogram": empty_histogram()})
+    
+    total = 0
+    for review in storage.reviews.all({"businessId": 1, "rating": 1, "createdAt": 1}):
+        start_dates = review_start_dates(review)
+        for scope, key in rollup_targets(review['businessId'], categories.get(review['businessId'])):
+            for granularity in GRANULARITIES:
+                rollup = rollups[(scope, key, granularity, start_dates[granularity])]
+                rollup['count'] += 1
+                rollup['ratingSum'] += review['rating']
+                rollup['histogram'][str(review['rating'])] += 1
+        total += 1
+    
+    storage.rollups.replace_all(
+        {"scope": scope, "key": key, "granularity": granularity, "start": start, **rollup}
+        for (scope, key, granularity, start), rollup in rollups.items()
+    )
+    return total, len(rollups)
+
+def get_trend(storage, scope, key, granularity, start, end):
+    """Return one entry per period from start to end inclusive, with empty periods filled in, plus totals."""
+    first = period_start(start, granularity)
+    rollups = {rollup['start']: rollup for rollup in storage.rollups.in_range(scope, key, granularity, first, end)}
+    
+    series = []
+    totals = {"count": 0, "ratingSum": 0, "histogram": empty_histogram()}
+    period = first
+    while period <= end:
+        rollup = rollups.get(period, {})
+        count = rollup.get('count', 0)
+        histogram = empty_histogram()
+        histogram.update(rollup.get('histogram', {}))
+        series.append({
+            "start": period.strftime('%Y-%m-%d'),
+            "count": count,
+            "averageRating": round(rollup['ratingSum'] / count, 2) if count else None,
+            "histogram": histogram
+        })
+        
+        totals['count'] += count
+        totals['ratingSum'] += rollup.get('ratingSum', 0)
+        for star, star_count in histogram.items():
+            totals['histogram'][star] += star_count
+        period = next_period(period, granularity)
+    
+    return {
+        "granularity": granularity,
+        "series": series,
+        "totals": {
+            "count": totals['count'],
+            "averageRating": round(totals['ratingSum'] / totals['count'], 2) if totals['count'] else None,
+            "histogram": totals['histogram']
+        }
+    }
@@ -0,0 +1,63 @@
+from config import Config
+
+# Businesses carry a bounded review summary so the detail page needs no review
+# queries: `latestReviews` holds the newest EMBEDDED_REVIEW_COUNT reviews (with
+# usernames) and `ratingHistogram` counts reviews per star. Both are kept up to
+# date by the review endpoints and rebuilt by rebuild_review_summaries.py; the
+# first review write to a business without a summary builds it from scratch.
+# The business fields of a review are not stored in the summary; the detail
+# page fills them in from the business itself.
+
+SUMMARY_FIELDS = ['userId', 'username', 'rating', 'text', 'createdAt']
+
+def empty_histogram():
+    return {str(star): 0 for star in range(1, 6)}
+
+def summary_entry(review):
+    entry = {"_id": review['_id']}
+    for field in SUMMARY_FIELDS:
+        if field in review:
+            entry[field] = review[field]
+    return entry
+
+def add_review_to_summary(storage, review):
+    if not storage.businesses.push_latest_review(
+        review['businessId'],
+        summary_entry(review),
+        Config.EMBEDDED_REVIEW_COUNT,
+        {str(review['rating']): 1}
+    ):
+        rebuild_review_summary(storage, review['businessId'])
+
+def update_review_in_summary(storage, review, update_data):
+    changes = {field: value for field, value in update_data.items() if field in SUMMARY_FIELDS}
+    histogram = {}
+    if 'rating' in update_data and update_data['rating'] != review['rating']:
+        histogram = {str(review['rating']): -1, str(update_data['rating']): 1}
+    
+    if not storage.businesses.update_latest_review(review['businessId'], review['_id'], changes, histogram):
+        rebuild_review_summary(storage, review['businessId'])
+
+def remove_review_from_summary(storage, review):
+    was_latest = storage.businesses.pull_latest_review(review['businessId'], review['_id'], {str(review['rating']): -1})
+    if was_latest is None:
+        rebuild_review_summary(storage, review['businessId'])
+    elif was_latest:
+        refresh_latest_reviews(storage, review['businessId'])
+
+def load_latest_reviews(storage, business_id):
+    reviews = storage.reviews.list_for_business(business_id, 0, Config.EMBEDDED_REVIEW_COUNT)
+    usernames = storage.users.usernames({review['userId'] for review in reviews})
+    for review in reviews:
+        if review['userId'] in usernames:
+            review['username'] = usernames[review['userId']]
+    return [summary_entry(review) for review in reviews]
+
+def refresh_latest_reviews(storage, business_id):
+    storage.businesses.set_review_summary(business_id, load_latest_reviews(storage, business_id))
+
+def rebuild_review_summary(storage, business_id):
+    histogram = empty_histogram()
+    histogram.update(storage.reviews.rating_histogram(business_id))
+    storage.businesses.set_review_summary(business_id, load_latest_reviews(storage, business_id), histogram)
+    return sum(histogram.values())
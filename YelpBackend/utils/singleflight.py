@@ -0,0 +1,92 @@
+import threading
+from collections import defaultdict
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution whose result
+    is shared with every caller that arrived while it was in flight."""
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+    
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._counters['executed'] += 1
+                leader = True
+            else:
+                self._counters['suppressed'] += 1
+                leader = False
+        
+        if leader:
+            self._run(key, call, fn)
+        else:
+            call.done.wait()
+        
+        if call.error is not None:
+            raise call.error
+        return call.result
+    
+    def do_in_background(self, key, fn):
+        """Start fn in a thread unless a call for key is already in flight."""
+        with self._lock:
+            if key in self._calls:
+                self._counters['suppressed_refreshes'] += 1
+                return False
+            call = self._calls[key] = _Call()
+            self._counters['background_refreshes'] += 1
+        
+        threading.Thread(target=self._run, args=(key, call, fn), daemon=True).start()
+        return True
+    
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._counters['errors'] += 1
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, inFlight=len(self._calls))
+    
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._counters.clear()
+
+flights = SingleFlight()
+
+def read_through(cache, key, loader):
+    """Serve key from cache; on a miss load it once for all concurrent callers, and
+    when the entry is stale return it immediately while one background refresh runs."""
+    flight_key = (cache.name, key)
+    
+    def load():
+        since = cache.generation()
+        value = loader()
+        if value is not None:
+            cache.set(key, value, since)
+        return value
+    
+    entry = cache.get_entry(key)
+    if entry is not None:
+        value, fresh = entry
+        if not fresh:
+            flights.do_in_background(flight_key, load)
+        return value
+    return flights.do(flight_key, load)
@@ -0,0 +1,42 @@
+import threading
+from config import Config
+
+# Routes, scripts and the derived-data helpers reach users, businesses, reviews
+# and review rollups through the repositories of one storage object instead of
+# pymongo collections. STORAGE_BACKEND picks MongoDB (utils/mongo_storage.py)
+# or an in-process, indexed store (utils/memory_storage.py) with the same
+# semantics, which needs no mongod and keeps data only for the life of the process.
+
+BACKENDS = ['mongo', 'memory']
+
+class DuplicateError(Exception):
+    pass
+
+_storage = None
+_lock = threading.Lock()
+
+def storage_backend():
+    return Config.STORAGE_BACKEND
+
+def create_storage(backend=None):
+    backend = backend or storage_backend()
+    if backend == 'memory':
+        from utils.memory_storage import MemoryStorage
+        return MemoryStorage()
+    if backend == 'mongo':
+        from utils.mongo_storage import MongoStorage
+        return MongoStorage()
+    raise ValueError(f"STORAGE_BACKEND must be one of: {', '.join(BACKENDS)}")
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+def set_storage(storage):
+    global _storage
+    with _lock:
+        _storage = storage
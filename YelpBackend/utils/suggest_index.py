@@ -0,0 +1,315 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from config import Config
+
+# In-process typeahead index. Every indexable term is stored as a
+# (term, kind, key) tuple in one sorted list, so the terms matching a prefix are
+# one contiguous range found by binary search. Business names are indexed from
+# every word start ("joe's coffee shop", "coffee shop", "shop"); categories and
+# cities are indexed once per distinct value with aggregated stats for ranking.
+#
+# Ranges of up to SUGGEST_SCAN_LIMIT terms are ranked by scanning all of them.
+# Every prefix matching more terms keeps its best entries per kind, ranked with
+# the key as the final tie-breaker, and writes re-rank the affected entries in
+# place. A list holds up to twice MAX_SUGGESTIONS entries, so an entry dropping
+# out of it only forces a rescan of the prefix once the list runs short.
+
+GROUP_KINDS = ['category', 'city']
+KINDS = ['business'] + GROUP_KINDS
+WORD_START = re.compile(r'(?:^|[\s\-/&(])(?=\w)')
+MAX_CHAR = '\U0010ffff'
+
+MAX_SUGGESTIONS = 50
+TOP_ENTRIES = MAX_SUGGESTIONS * 2
+
+def normalize(text):
+    return ' '.join(str(text or '').lower().split())
+
+def name_terms(name):
+    normalized = normalize(name)
+    return {normalized[match.end():] for match in WORD_START.finditer(normalized)} | {normalized}
+
+def prefixes(term):
+    return [term[:length] for length in range(1, len(term) + 1)]
+
+class SuggestIndex:
+    def __init__(self):
+        self._keys = []
+        self._businesses = {}
+        self._groups = {kind: {} for kind in GROUP_KINDS}
+        self._top = {}
+        self._lock = threading.RLock()
+        self.built_at = None
+    
+    @property
+    def built(self):
+        return self.built_at is not None
+    
+    def reset(self):
+        with self._lock:
+            self._keys = []
+            self._businesses = {}
+            self._groups = {kind: {} for kind in GROUP_KINDS}
+            self._top = {}
+            self.built_at = None
+    
+    def build(self, businesses):
+        index = SuggestIndex()
+        keys = []
+        for business in businesses:
+            keys.extend(index._add(business, sort=False))
+        keys.sort()
+        index._keys = keys
+        index._collect(0, len(keys), 0)
+        with self._lock:
+            self._keys = keys
+            self._businesses = index._businesses
+            self._groups = index._groups
+            self._top = index._top
+            self.built_at = time.monotonic()
+    
+    def add_business(self, business):
+        with self._lock:
+            if self.built:
+                self._add(business)
+    
+    def update_business(self, business):
+        with self._lock:
+            if self.built:
+                self._remove(str(business['_id']))
+                self._add(business)
+    
+    def remove_business(self, business_id):
+        with self._lock:
+            if self.built:
+                self._remove(str(business_id))
+    
+    def update_stats(self, business_id, rating, review_count):
+        with self._lock:
+            business_id = str(business_id)
+            entry = self._businesses.get(business_id) if self.built else None
+            if entry is None:
+                return
+            changed = [('business', business_id, name_terms(entry['name']))]
+            for kind in GROUP_KINDS:
+                value = normalize(entry[kind])
+                group = self._groups[kind].get(value)
+                if group is None:
+                    continue
+                group['ratingSum'] += rating - entry['rating']
+                group['reviewCount'] += review_count - entry['reviewCount']
+                changed.append((kind, value, [value]))
+            entry['rating'] = rating
+            entry['reviewCount'] = review_count
+            self._rerank(changed)
+    
+    def suggest(self, prefix, kinds, limit):
+        prefix = normalize(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        with self._lock:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._scan(*self._range(prefix))
+            return {kind: [self._present(kind, rank[-1]) for rank in top[kind]['ranks'][:limit]] for kind in kinds}
+    
+    def _present(self, kind, key):
+        if kind == 'business':
+            entry = self._businesses[key]
+            return {
+                "id": key,
+                "name": entry['name'],
+                "category": entry['category'],
+                "city": entry['city'],
+                "state": entry['state'],
+                "rating": entry['rating'],
+                "reviewCount": entry['reviewCount']
+            }
+        group = self._groups[kind][key]
+        return {
+            "name": group['name'],
+            "businessCount": group['businessCount'],
+            "rating": round(group['ratingSum'] / group['businessCount'], 1),
+            "reviewCount": group['reviewCount']
+        }
+    
+    def _rank(self, kind, key):
+        """Sort key for an entry: best first, ties broken by the key."""
+        if kind == 'business':
+            entry = self._businesses[key]
+            return (-entry['rating'], -entry['reviewCount'], key)
+        group = self._groups[kind][key]
+        return (-group['reviewCount'], -group['ratingSum'] / group['businessCount'], key)
+    
+    def _exists(self, kind, key):
+        return key in (self._businesses if kind == 'business' else self._groups[kind])
+    
+    def _range(self, prefix):
+        return bisect_left(self._keys, (prefix,)), bisect_left(self._keys, (prefix + MAX_CHAR,))
+    
+    def _scan(self, start, end):
+        matches = {kind: set() for kind in KINDS}
+        for _, kind, key in self._keys[start:end]:
+            matches[kind].add(key)
+        return {
+            kind: {
+                "ranks": heapq.nsmallest(TOP_ENTRIES, (self._rank(kind, key) for key in keys)),
+                "complete": len(keys) <= TOP_ENTRIES
+            }
+            for kind, keys in matches.items()
+        }
+    
+    def _merge(self, parts):
+        merged = {}
+        for kind in KINDS:
+            ranks = set()
+            for part in parts:
+                ranks.update(part[kind]['ranks'])
+            merged[kind] = {
+                "ranks": sorted(ranks)[:TOP_ENTRIES],
+                "complete": len(ranks) <= TOP_ENTRIES and all(part[kind]['complete'] for part in parts)
+            }
+        return merged
+    
+    def _collect(self, start, end, depth):
+        """Fill the top lists of every large prefix in a range of terms that share their first depth characters."""
+        if end - start <= Config.SUGGEST_SCAN_LIMIT:
+            return self._scan(start, end)
+        
+        prefix = self._keys[start][0][:depth]
+        position = start
+        while position < end and len(self._keys[position][0]) == depth:
+            position += 1
+        parts = [self._scan(start, position)] if position > start else []
+        while position < end:
+            child = self._keys[position][0][:depth + 1]
+            child_end = bisect_left(self._keys, (child + MAX_CHAR,), position, end)
+            parts.append(self._collect(position, child_end, depth + 1))
+            position = child_end
+        
+        top = self._merge(parts)
+        if depth:
+            self._top[prefix] = top
+        return top
+    
+    def _rerank(self, changed):
+        """Update the top lists of every prefix of the given (kind, key, terms) entries after they changed."""
+        entries = {}
+        for kind, key, terms in changed:
+            for term in terms:
+                for prefix in prefixes(term):
+                    entries.setdefault(prefix, set()).add((kind, key))
+        
+        for prefix, prefix_entries in entries.items():
+            start, end = self._range(prefix)
+            top = self._top.get(prefix)
+            if end - start <= Config.SUGGEST_SCAN_LIMIT:
+                self._top.pop(prefix, None)
+            elif top is None or not all(self._place(top[kind], kind, key) for kind, key in prefix_entries):
+                self._top[prefix] = self._scan(start, end)
+    
+    def _place(self, top, kind, key):
+        """Move one entry within a top list; returns False when the list needs a rescan."""
+        ranks = top['ranks']
+        for position, rank in enumerate(ranks):
+            if rank[-1] == key:
+                del ranks[position]
+                break
+        
+        if self._exists(kind, key):
+            rank = self._rank(kind, key)
+            if top['complete'] or (ranks and rank < ranks[-1]):
+                insort(ranks, rank)
+                if len(ranks) > TOP_ENTRIES:
+                    ranks.pop()
+                    top['complete'] = False
+        return top['complete'] or len(ranks) >= MAX_SUGGESTIONS
+    
+    def _add(self, business, sort=True):
+        business_id = str(business['_id'])
+        entry = {
+            "name": business.get('name', ''),
+            "category": business.get('category', ''),
+            "city": business.get('city', ''),
+            "state": business.get('state', ''),
+            "rating": business.get('rating', 0),
+            "reviewCount": business.get('reviewCount', 0)
+        }
+        self._businesses[business_id] = entry
+        
+        terms = [term for term in name_terms(entry['name']) if term]
+        keys = [(term, 'business', business_id) for term in terms]
+        changed = [('business', business_id, terms)]
+        for kind in GROUP_KINDS:
+            value = normalize(entry[kind])
+            if not value:
+                continue
+            group = self._groups[kind].get(value)
+            if group is None:
+                group = {"name": entry[kind], "businessCount": 0, "ratingSum": 0, "reviewCount": 0}
+                self._groups[kind][value] = group
+                keys.append((value, kind, value))
+            group['businessCount'] += 1
+            group['ratingSum'] += entry['rating']
+            group['reviewCount'] += entry['reviewCount']
+            changed.append((kind, value, [value]))
+        
+        if sort:
+            for key in keys:
+                insort(self._keys, key)
+            self._rerank(changed)
+        return keys
+    
+    def _remove(self, business_id):
+        entry = self._businesses.pop(business_id, None)
+        if entry is None:
+            return
+        
+        terms = [term for term in name_terms(entry['name']) if term]
+        keys = [(term, 'business', business_id) for term in terms]
+        changed = [('business', business_id, terms)]
+        for kind in GROUP_KINDS:
+            value = normalize(entry[kind])
+            group = self._groups[kind].get(value)
+            if group is None:
+                continue
+            group['businessCount'] -= 1
+            group['ratingSum'] -= entry['rating']
+            group['reviewCount'] -= entry['reviewCount']
+            if group['businessCount'] == 0:
+                del self._groups[kind][value]
+                keys.append((value, kind, value))
+            changed.append((kind, value, [value]))
+        
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+        self._rerank(changed)
+
+suggest_index = SuggestIndex()
+_build_lock = threading.Lock()
+
+def load_businesses(storage):
+    return storage.businesses.all({"name": 1, "category": 1, "city": 1, "state": 1, "rating": 1, "reviewCount": 1})
+
+def build_suggest_index(storage):
+    with _build_lock:
+        if not suggest_index.built:
+            suggest_index.build(load_businesses(storage))
+
+def refresh_suggest_index(storage):
+    try:
+        suggest_index.build(load_businesses(storage))
+    finally:
+        _build_lock.release()
+
+def get_suggest_index(storage):
+    """Return the index, building it on first use and refreshing it in the background once stale."""
+    if not suggest_index.built:
+        build_suggest_index(storage)
+    elif time.monotonic() - suggest_index.built_at > Config.SUGGEST_REFRESH_SECONDS and _build_lock.acquire(blocking=False):
+        threading.Thread(target=refresh_suggest_index, args=(storage,), daemon=True).start()
+    return suggest_index
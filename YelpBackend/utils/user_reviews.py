@@ -0,0 +1,73 @@
+import threading
+from datetime import datetime, timedelta
+from utils.cache import review_cache, invalidate_business
+from utils.db import get_db
+from utils.helpers import validate_object_id
+from utils.review_buckets import buckets_enabled, set_bucket_business_info
+
+# A user's review history is read newest first from the (userId, createdAt, _id)
+# index with keyset pagination: the cursor names the last review of the previous
+# page, so every page is one bounded index range no matter how many reviews the
+# user has written. Reviews carry the business name and category from write
+# time; renames are copied onto the business's reviews in the background.
+
+BUSINESS_INFO_FIELDS = {'name': 'businessName', 'category': 'businessCategory'}
+
+EPOCH = datetime(1970, 1, 1)
+
+_sync_lock = threading.Lock()
+
+def business_info(business):
+    return {review_field: business.get(field) for field, review_field in BUSINESS_INFO_FIELDS.items()}
+
+def encode_cursor(review):
+    return f"{(review['createdAt'] - EPOCH) // timedelta(microseconds=1)}-{review['_id']}"
+
+def decode_cursor(cursor):
+    timestamp, _, review_id = cursor.partition('-')
+    review_id = validate_object_id(review_id)
+    if not timestamp.isdigit() or not review_id:
+        raise ValueError("Invalid cursor")
+    return EPOCH + timedelta(microseconds=int(timestamp)), review_id
+
+def sync_business_info(storage, business_id):
+    with _sync_lock:
+        business = storage.businesses.get(business_id, {"name": 1, "category": 1})
+        if business:
+            storage.reviews.set_business_info(business_id, business_info(business))
+            if buckets_enabled():
+                set_bucket_business_info(get_db(), business_id, business_info(business))
+            review_cache.clear()
+            invalidate_business(business_id)
+
+def schedule_business_info_sync(storage, business_id):
+    def run():
+        try:
+            sync_business_info(storage, business_id)
+        except Exception as e:
+            print(f"Review business info sync failed for {business_id}: {e}")
+    
+    threading.Thread(target=run, daemon=True).start()
+
+def attach_business_info(storage, reviews):
+    missing = {review['businessId'] for review in reviews if BUSINESS_INFO_FIELDS['name'] not in review}
+    if not missing:
+        return reviews
+    
+    businesses = {business['_id']: business for business in storage.businesses.get_many(missing, {"name": 1, "category": 1})}
+    for review in reviews:
+        if review['businessId'] in missing and review['businessId'] in businesses:
+            review.update(business_info(businesses[review['businessId']]))
+    return reviews
+
+def load_user_reviews(storage, user_id, cursor, limit, projection=None, with_business_info=True):
+    """Return (reviews, next cursor) for one page of a user's reviews, newest first."""
+    before = decode_cursor(cursor) if cursor else None
+    if projection is not None:
+        projection = dict(projection, createdAt=1, businessId=1)
+    reviews = storage.reviews.list_for_user(user_id, before, limit + 1, projection)
+    next_cursor = encode_cursor(reviews[limit - 1]) if len(reviews) > limit else None
+    reviews = reviews[:limit]
+    if with_business_info:
+        attach_business_info(storage, reviews)
+    return reviews, next_cursor